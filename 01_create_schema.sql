@@ -10,7 +10,79 @@ CREATE TABLE products (
     brand VARCHAR(100),
     sku VARCHAR(50) UNIQUE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    search_vector TSVECTOR
+    search_vector TSVECTOR,
+    phonetic_keys TEXT[]
+);
+
+-- Поисковый вектор вычисляется триггером только для вставляемых и измененных строк,
+-- поэтому запуск бенчмарка не перестраивает его по всей таблице
+CREATE TRIGGER products_search_vector_update
+    BEFORE INSERT OR UPDATE OF name, description ON products
+    FOR EACH ROW EXECUTE FUNCTION
+    tsvector_update_trigger(search_vector, 'pg_catalog.english', name, description);
+
+CREATE INDEX idx_products_search_vector_missing ON products (id) WHERE search_vector IS NULL;
+
+-- Коды Metaphone отдельных слов названия; IMMUTABLE нужна для функционального индекса
+CREATE OR REPLACE FUNCTION name_metaphone_keys(value TEXT)
+RETURNS TEXT[]
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT COALESCE(array_agg(DISTINCT key), '{}')
+    FROM regexp_split_to_table(lower(value), '[^[:alnum:]]+') AS token,
+         metaphone(token, 10) AS key
+    WHERE key <> ''
+$$;
+
+-- Фонетические ключи каждого латинского слова названия с префиксом алгоритма
+-- (S: soundex, M: metaphone, D: dmetaphone); поддерживаются триггером. Триггер замедляет COPY
+-- примерно вдвое, но отключение на время загрузки с последующим UPDATE по всей таблице
+-- не быстрее (та же функция на каждую строку плюс вторая версия строки) и выполняется
+-- в одном процессе, тогда как триггер считает ключи в процессах шардов параллельно
+CREATE OR REPLACE FUNCTION name_phonetic_keys(value TEXT)
+RETURNS TEXT[]
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT COALESCE(array_agg(DISTINCT key), '{}')
+    FROM regexp_split_to_table(lower(value), '[^[:alnum:]]+') AS token,
+         unnest(ARRAY['S:' || soundex(token),
+                      'M:' || metaphone(token, 10),
+                      'D:' || dmetaphone(token),
+                      'D:' || dmetaphone_alt(token)]) AS key
+    WHERE token ~ '^[a-z]+$'
+      AND key !~ ':$'
+$$;
+
+CREATE OR REPLACE FUNCTION products_phonetic_keys_update()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.phonetic_keys := name_phonetic_keys(NEW.name);
+    RETURN NEW;
+END
+$$;
+
+CREATE TRIGGER products_phonetic_keys_update
+    BEFORE INSERT OR UPDATE OF name ON products
+    FOR EACH ROW EXECUTE FUNCTION products_phonetic_keys_update();
+
+CREATE INDEX idx_products_phonetic_keys_missing ON products (id) WHERE phonetic_keys IS NULL;
+
+-- Версия набора данных: увеличивается при каждой загрузке products
+CREATE TABLE dataset_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version BIGINT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Кэш эталонных множеств: отсортированные id товаров, содержащих термин
+CREATE TABLE relevance_sets (
+    term TEXT NOT NULL,
+    dataset_version BIGINT NOT NULL,
+    product_ids INTEGER[] NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (term, dataset_version)
 );
 
 -- Таблица для логирования результатов поиска
@@ -23,6 +95,172 @@ CREATE TABLE search_benchmarks (
     result_count INTEGER NOT NULL,
     index_used BOOLEAN DEFAULT FALSE,
     test_run_id UUID NOT NULL,
+    scenario VARCHAR(100) NOT NULL DEFAULT 'default',
+    cache_mode VARCHAR(10) NOT NULL DEFAULT 'warm',
+    iterations INTEGER NOT NULL DEFAULT 1,
+    p50_ms FLOAT,
+    p95_ms FLOAT,
+    p99_ms FLOAT,
+    stddev_ms FLOAT,
+    samples_ms FLOAT[],
+    execution_mode VARCHAR(20) NOT NULL DEFAULT 'simple',
+    prepare_ms FLOAT,
+    fetch_ms FLOAT,
+    parallel_workers INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Фактические планы выполнения запросов бенчмарка (EXPLAIN ANALYZE, BUFFERS)
+CREATE TABLE search_query_plans (
+    id SERIAL PRIMARY KEY,
+    benchmark_id INTEGER NOT NULL REFERENCES search_benchmarks (id) ON DELETE CASCADE,
+    execution_time_ms FLOAT NOT NULL,
+    planning_time_ms FLOAT NOT NULL,
+    shared_hit_blocks BIGINT NOT NULL,
+    shared_read_blocks BIGINT NOT NULL,
+    index_names TEXT[] NOT NULL,
+    node_types TEXT[] NOT NULL,
+    plan JSONB NOT NULL,
+    workers_planned INTEGER,
+    workers_launched INTEGER
+);
+CREATE INDEX idx_search_query_plans_benchmark ON search_query_plans (benchmark_id);
+
+-- Идентификаторы, возвращенные методами поиска, с рангом и оценкой близости
+CREATE TABLE search_results (
+    test_run_id UUID NOT NULL,
+    method VARCHAR(50) NOT NULL,
+    query VARCHAR(255) NOT NULL,
+    dataset_size INTEGER NOT NULL,
+    product_id INTEGER NOT NULL,
+    rank INTEGER NOT NULL,
+    score REAL
+);
+CREATE INDEX idx_search_results_method_query ON search_results (method, query);
+CREATE INDEX idx_search_results_run ON search_results (test_run_id);
+
+-- Результаты нагрузочного режима: пропускная способность и задержки при N клиентах
+CREATE TABLE load_test_results (
+    id SERIAL PRIMARY KEY,
+    test_run_id UUID NOT NULL,
+    method VARCHAR(50) NOT NULL,
+    dataset_size INTEGER NOT NULL,
+    concurrency INTEGER NOT NULL,
+    target_rate FLOAT NOT NULL,
+    duration_s FLOAT NOT NULL,
+    requests INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    throughput_qps FLOAT NOT NULL,
+    error_rate FLOAT NOT NULL,
+    p50_ms FLOAT,
+    p95_ms FLOAT,
+    p99_ms FLOAT,
+    max_ms FLOAT,
+    latency_histogram JSONB NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Время построения и объем индексов прикладного движка поиска в памяти процесса
+CREATE TABLE engine_builds (
+    id SERIAL PRIMARY KEY,
+    test_run_id UUID NOT NULL,
+    dataset_size INTEGER NOT NULL,
+    component VARCHAR(50) NOT NULL,
+    build_time_ms FLOAT NOT NULL,
+    memory_bytes BIGINT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Серверный профиль методов поиска: разности pg_stat_statements, pg_statio и pg_stat_io
+-- за время замеров и выборка событий ожидания pg_stat_activity
+CREATE TABLE method_profiles (
+    id SERIAL PRIMARY KEY,
+    test_run_id UUID NOT NULL,
+    method VARCHAR(50) NOT NULL,
+    dataset_size INTEGER NOT NULL,
+    calls BIGINT,
+    exec_time_ms FLOAT,
+    plan_time_ms FLOAT,
+    shared_blks_hit BIGINT,
+    shared_blks_read BIGINT,
+    temp_blks_written BIGINT,
+    blk_read_time_ms FLOAT,
+    heap_blks_hit BIGINT,
+    heap_blks_read BIGINT,
+    idx_blks_hit BIGINT,
+    idx_blks_read BIGINT,
+    io_reads BIGINT,
+    io_read_time_ms FLOAT,
+    samples INTEGER NOT NULL,
+    cpu_share FLOAT,
+    io_wait_share FLOAT,
+    lock_wait_share FLOAT,
+    other_wait_share FLOAT,
+    wait_events JSONB NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Кэш результатов поиска на скошенном потоке запросов: попадания, память и задержки с кэшем и без
+CREATE TABLE query_cache_benchmarks (
+    id SERIAL PRIMARY KEY,
+    test_run_id UUID NOT NULL,
+    method VARCHAR(50) NOT NULL,
+    dataset_size INTEGER NOT NULL,
+    requests INTEGER NOT NULL,
+    distinct_queries INTEGER NOT NULL,
+    zipf_exponent FLOAT NOT NULL,
+    cache_max_bytes BIGINT NOT NULL,
+    ttl_s FLOAT NOT NULL,
+    hit_rate FLOAT NOT NULL,
+    evictions INTEGER NOT NULL,
+    memory_bytes BIGINT NOT NULL,
+    entries INTEGER NOT NULL,
+    uncached_p50_ms FLOAT NOT NULL,
+    uncached_p99_ms FLOAT NOT NULL,
+    uncached_mean_ms FLOAT NOT NULL,
+    cached_p50_ms FLOAT NOT NULL,
+    cached_p99_ms FLOAT NOT NULL,
+    cached_mean_ms FLOAT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Стоимость индексов из 02_create_indexes.sql: построение при разном maintenance_work_mem,
+-- объем на диске и замедление массовой вставки
+CREATE TABLE index_benchmarks (
+    id SERIAL PRIMARY KEY,
+    test_run_id UUID NOT NULL,
+    index_name VARCHAR(100) NOT NULL,
+    access_method VARCHAR(20) NOT NULL,
+    dataset_size INTEGER NOT NULL,
+    maintenance_work_mem VARCHAR(20) NOT NULL,
+    build_time_ms FLOAT NOT NULL,
+    index_bytes BIGINT NOT NULL,
+    insert_rows INTEGER NOT NULL,
+    insert_rows_per_s FLOAT,
+    baseline_rows_per_s FLOAT,
+    insert_slowdown FLOAT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Смешанная нагрузка: задержки поиска по окнам времени под непрерывной записью в products
+CREATE TABLE mixed_workload_results (
+    id SERIAL PRIMARY KEY,
+    test_run_id UUID NOT NULL,
+    method VARCHAR(50) NOT NULL,
+    dataset_size INTEGER NOT NULL,
+    fastupdate BOOLEAN NOT NULL,
+    gin_pending_list_limit INTEGER,
+    write_rate FLOAT NOT NULL,
+    actual_write_rate FLOAT,
+    window_start_s FLOAT NOT NULL,
+    requests INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    p50_ms FLOAT,
+    p99_ms FLOAT,
+    inserted_rows INTEGER NOT NULL,
+    updated_rows INTEGER NOT NULL,
+    pending_pages BIGINT,
+    pending_tuples BIGINT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -31,14 +269,65 @@ CREATE TABLE test_queries (
     id SERIAL PRIMARY KEY,
     correct_term VARCHAR(255) NOT NULL,
     typo_term VARCHAR(255) NOT NULL,
-    error_type VARCHAR(50) NOT NULL
+    error_type VARCHAR(50) NOT NULL,
+    edit_distance SMALLINT,
+    popularity_rank INTEGER,
+    dataset_version BIGINT
 );
 COMMENT ON TABLE products IS 'Основная таблица с данными о товарах для тестирования нечеткого поиска.';
 COMMENT ON COLUMN products.name IS 'Название товара. Основное поле для тестов.';
 COMMENT ON COLUMN products.brand IS 'Бренд товара. Также используется в тестах.';
+COMMENT ON COLUMN products.phonetic_keys IS 'Фонетические ключи отдельных слов названия: S: soundex, M: metaphone, D: dmetaphone.';
+COMMENT ON FUNCTION name_metaphone_keys(TEXT) IS 'Массив кодов Metaphone слов строки для поиска по GIN-индексу.';
+COMMENT ON FUNCTION name_phonetic_keys(TEXT) IS 'Фонетические ключи слов строки в формате products.phonetic_keys.';
+
+COMMENT ON TABLE dataset_state IS 'Счетчик версии набора данных, используемый как отпечаток для кэшей.';
+COMMENT ON TABLE relevance_sets IS 'Эталонные множества id товаров по термину для каждой версии набора данных.';
 
 COMMENT ON TABLE search_benchmarks IS 'Таблица для сбора результатов бенчмарков.';
 COMMENT ON COLUMN search_benchmarks.method IS 'Название тестируемого метода (LIKE, pg_trgm и т.д.).';
-COMMENT ON COLUMN search_benchmarks.execution_time_ms IS 'Время выполнения запроса в миллисекундах.';
+COMMENT ON COLUMN search_benchmarks.execution_time_ms IS 'Среднее время выполнения запроса по измеренным итерациям в миллисекундах.';
+COMMENT ON COLUMN search_benchmarks.scenario IS 'Метка режима прогона (default, sweep и т.д.).';
+COMMENT ON COLUMN search_benchmarks.cache_mode IS 'Режим кэша при замере: warm или cold.';
+COMMENT ON COLUMN search_benchmarks.samples_ms IS 'Время каждой измеренной итерации, мс.';
+COMMENT ON COLUMN search_benchmarks.execution_mode IS 'Способ выполнения: simple, prepared (PREPARE/EXECUTE) или cursor (именованный курсор).';
+COMMENT ON COLUMN search_benchmarks.prepare_ms IS 'Время планирования по Planning Time из EXPLAIN (ANALYZE) в том же режиме выполнения, мс.';
+COMMENT ON COLUMN search_benchmarks.fetch_ms IS 'Только режим cursor: среднее время FETCH после DECLARE (выполнение идет по ходу FETCH), мс; NULL в остальных режимах.';
+COMMENT ON COLUMN search_benchmarks.parallel_workers IS 'Значение max_parallel_workers_per_gather при замере; NULL - настройка сервера.';
+
+COMMENT ON TABLE search_query_plans IS 'Измеренные планы запросов, связанные с search_benchmarks.';
+COMMENT ON COLUMN search_query_plans.index_names IS 'Индексы, фактически использованные в плане.';
+COMMENT ON COLUMN search_query_plans.workers_launched IS 'Запущенные параллельные воркеры по всем узлам Gather плана.';
+
+COMMENT ON TABLE search_results IS 'Выдача методов поиска по каждому запросу бенчмарка; основа расчета точности.';
+COMMENT ON COLUMN search_results.rank IS 'Позиция товара в выдаче метода, начиная с 1.';
+
+COMMENT ON TABLE load_test_results IS 'Пропускная способность, гистограммы задержек и доля ошибок по уровням параллелизма.';
+
+COMMENT ON TABLE engine_builds IS 'Построение индексов прикладного движка: время и оценка занимаемой памяти по компонентам.';
+COMMENT ON COLUMN engine_builds.memory_bytes IS 'Объем массивов NumPy и словарей компонента, байт.';
+
+COMMENT ON TABLE method_profiles IS 'Серверная разбивка времени методов поиска по сессии: CPU, ввод-вывод, блокировки и планирование.';
+COMMENT ON COLUMN method_profiles.exec_time_ms IS 'Время выполнения по pg_stat_statements; NULL, если модуль не загружен.';
+COMMENT ON COLUMN method_profiles.io_reads IS 'Чтения отношений по pg_stat_io (PostgreSQL 16+); счетчик общий для всех клиентских процессов.';
+COMMENT ON COLUMN method_profiles.cpu_share IS 'Доля выборок pg_stat_activity, в которых процесс активен без ожидания.';
+COMMENT ON COLUMN method_profiles.wait_events IS 'Число выборок по тип:событие ожидания; CPU - активен без ожидания.';
+
+COMMENT ON TABLE query_cache_benchmarks IS 'Один и тот же скошенный поток запросов без кэша и через LRU-кэш результатов с TTL.';
+COMMENT ON COLUMN query_cache_benchmarks.memory_bytes IS 'Оценка памяти записей кэша (ключи и выдача) в конце потока, байт.';
+
+COMMENT ON TABLE index_benchmarks IS 'Построение каждого индекса по отдельности: время, размер и влияние на скорость вставки.';
+COMMENT ON COLUMN index_benchmarks.index_bytes IS 'Размер индекса по pg_relation_size после построения (для секционированной products - сумма по индексам секций), байт.';
+COMMENT ON COLUMN index_benchmarks.insert_rows_per_s IS 'Скорость COPY порции строк с фиксацией транзакции, когда из индексов 02 существует только этот; общая для всех maintenance_work_mem.';
+COMMENT ON COLUMN index_benchmarks.insert_slowdown IS 'Во сколько раз вставка медленнее, чем без индексов из 02_create_indexes.sql.';
+
+COMMENT ON TABLE mixed_workload_results IS 'Перцентили задержек методов поиска по окнам времени при одновременных вставках и обновлениях.';
+COMMENT ON COLUMN mixed_workload_results.gin_pending_list_limit IS 'gin_pending_list_limit GIN-индексов products, кБ; NULL - значение сервера.';
+COMMENT ON COLUMN mixed_workload_results.write_rate IS 'Заданная частота записи, строк/с.';
+COMMENT ON COLUMN mixed_workload_results.actual_write_rate IS 'Достигнутая частота записи за прогон настройки, строк/с; сбойные порции не учитываются, NULL - для прогонов до появления столбца.';
+COMMENT ON COLUMN mixed_workload_results.pending_pages IS 'Страницы списков ожидания всех GIN-индексов products на конец окна (pgstatginindex); NULL без pgstattuple.';
 
-COMMENT ON TABLE test_queries IS 'Таблица с тестовыми запросами и различными типами опечаток.';
\ No newline at end of file
+COMMENT ON TABLE test_queries IS 'Таблица с тестовыми запросами и различными типами опечаток.';
+COMMENT ON COLUMN test_queries.error_type IS 'Тип ошибки: transposition, deletion, insertion, substitution или multiple.';
+COMMENT ON COLUMN test_queries.edit_distance IS 'Число внесенных правок; NULL для запросов, добавленных вручную.';
+COMMENT ON COLUMN test_queries.popularity_rank IS 'Ранг слова по частоте в каталоге, по которому оно выбиралось по закону Ципфа.';
\ No newline at end of file
@@ -2,4 +2,15 @@ CREATE INDEX idx_products_name ON products(name);
 CREATE INDEX idx_products_name_lower ON products(LOWER(name));
 CREATE INDEX idx_products_name_trgm ON products USING gin (name gin_trgm_ops);
 CREATE INDEX idx_products_name_soundex ON products(soundex(name));
-CREATE INDEX idx_products_fts ON products USING gin(search_vector);
\ No newline at end of file
+CREATE INDEX idx_products_fts ON products USING gin(search_vector);
+
+-- GiST-индекс триграмм для KNN-поиска (ORDER BY name <-> term LIMIT k);
+-- операторы % и <% обслуживает GIN-индекс idx_products_name_trgm
+CREATE INDEX idx_products_name_trgm_gist ON products USING gist (name gist_trgm_ops);
+
+-- Функциональный индекс по кодам Metaphone слов названия (метод Metaphone и фонетический сигнал Hybrid)
+CREATE INDEX idx_products_name_metaphone ON products USING gin (name_metaphone_keys(name));
+
+-- Фонетические ключи отдельных слов: в отличие от soundex(name) по всему названию
+-- ключ не определяется первой буквой бренда
+CREATE INDEX idx_products_phonetic_keys ON products USING gin (phonetic_keys);
\ No newline at end of file
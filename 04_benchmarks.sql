@@ -1,27 +1,44 @@
-CREATE OR REPLACE FUNCTION analyze_query_plan(query_text TEXT)
+-- Старая версия без ANALYZE имела другую сигнатуру
+DROP FUNCTION IF EXISTS analyze_query_plan(TEXT);
+
+CREATE OR REPLACE FUNCTION analyze_query_plan(query_text TEXT, with_analyze BOOLEAN DEFAULT FALSE)
 RETURNS TABLE(
     node_type TEXT,
     index_name TEXT,
     startup_cost FLOAT,
     total_cost FLOAT,
-    rows BIGINT
+    rows BIGINT,
+    actual_time_ms FLOAT,
+    shared_hit_blocks BIGINT,
+    shared_read_blocks BIGINT
 ) AS $$
 DECLARE
     plan_json JSON;
-    plan_node JSON;
 BEGIN
-    EXECUTE 'EXPLAIN (FORMAT JSON) ' || query_text INTO plan_json;
+    -- С with_analyze запрос реально выполняется, и план содержит время и буферы
+    IF with_analyze THEN
+        EXECUTE 'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ' || query_text INTO plan_json;
+    ELSE
+        EXECUTE 'EXPLAIN (FORMAT JSON) ' || query_text INTO plan_json;
+    END IF;
 
-    -- Парсинг JSON плана
-    FOR plan_node IN SELECT * FROM json_array_elements(plan_json->0->'Plan'->'Plans' || jsonb_build_array(plan_json->0->'Plan'))
-    LOOP
-        node_type := plan_node->>'Node Type';
-        index_name := COALESCE(plan_node->>'Index Name', '');
-        startup_cost := (plan_node->>'Startup Cost')::FLOAT;
-        total_cost := (plan_node->>'Total Cost')::FLOAT;
-        rows := (plan_node->>'Plan Rows')::BIGINT;
-        RETURN NEXT;
-    END LOOP;
+    -- Обход всех узлов плана, включая вложенные
+    RETURN QUERY
+    WITH RECURSIVE plan_nodes(node) AS (
+        SELECT plan_json::jsonb->0->'Plan'
+        UNION ALL
+        SELECT child
+        FROM plan_nodes, jsonb_array_elements(COALESCE(plan_nodes.node->'Plans', '[]'::jsonb)) AS child
+    )
+    SELECT plan_nodes.node->>'Node Type',
+           COALESCE(plan_nodes.node->>'Index Name', ''),
+           (plan_nodes.node->>'Startup Cost')::FLOAT,
+           (plan_nodes.node->>'Total Cost')::FLOAT,
+           (plan_nodes.node->>'Plan Rows')::BIGINT,
+           (plan_nodes.node->>'Actual Total Time')::FLOAT,
+           (plan_nodes.node->>'Shared Hit Blocks')::BIGINT,
+           (plan_nodes.node->>'Shared Read Blocks')::BIGINT
+    FROM plan_nodes;
 END;
 $$ LANGUAGE plpgsql;
 
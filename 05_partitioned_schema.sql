@@ -0,0 +1,56 @@
+-- Необязательная секционированная схема products для экспериментов на больших объемах.
+-- Запускается после 01_create_schema.sql на пустой базе и заменяет products
+-- хеш-секционированной таблицей; затем, как обычно, generate_data.py и 02_create_indexes.sql.
+-- Индексы из 02_create_indexes.sql создаются на родительской таблице и автоматически
+-- строятся в каждой секции, поэтому триграммные и FTS-индексы получаются посекционными.
+DROP TABLE IF EXISTS products;
+
+-- Ключ секционирования входит в первичный ключ, поэтому глобальная уникальность sku
+-- не проверяется: артикул формируется из id и уникален по построению
+CREATE TABLE products (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY,
+    name VARCHAR(255) NOT NULL,
+    description TEXT,
+    category VARCHAR(100),
+    brand VARCHAR(100),
+    sku VARCHAR(50),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    search_vector TSVECTOR,
+    phonetic_keys TEXT[],
+    PRIMARY KEY (id)
+) PARTITION BY HASH (id);
+
+-- Хеш по id дает секции одинакового размера: параллельный Append распределяет
+-- последовательное сканирование по секциям
+DO $$
+DECLARE
+    partition_count CONSTANT INTEGER := 16;
+BEGIN
+    FOR remainder IN 0..partition_count - 1 LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF products FOR VALUES WITH (MODULUS %s, REMAINDER %s)',
+            'products_p' || lpad(remainder::TEXT, 2, '0'), partition_count, remainder
+        );
+    END LOOP;
+END
+$$;
+
+CREATE INDEX idx_products_sku ON products (sku);
+
+CREATE TRIGGER products_search_vector_update
+    BEFORE INSERT OR UPDATE OF name, description ON products
+    FOR EACH ROW EXECUTE FUNCTION
+    tsvector_update_trigger(search_vector, 'pg_catalog.english', name, description);
+
+CREATE INDEX idx_products_search_vector_missing ON products (id) WHERE search_vector IS NULL;
+
+CREATE TRIGGER products_phonetic_keys_update
+    BEFORE INSERT OR UPDATE OF name ON products
+    FOR EACH ROW EXECUTE FUNCTION products_phonetic_keys_update();
+
+CREATE INDEX idx_products_phonetic_keys_missing ON products (id) WHERE phonetic_keys IS NULL;
+
+COMMENT ON TABLE products IS 'Основная таблица с данными о товарах, секционированная по хешу id.';
+COMMENT ON COLUMN products.name IS 'Название товара. Основное поле для тестов.';
+COMMENT ON COLUMN products.brand IS 'Бренд товара. Также используется в тестах.';
+COMMENT ON COLUMN products.phonetic_keys IS 'Фонетические ключи отдельных слов названия: S: soundex, M: metaphone, D: dmetaphone.';
\ No newline at end of file
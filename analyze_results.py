@@ -1,10 +1,17 @@
+import argparse
+import hashlib
+import json
 import psycopg2
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
 import os
 import numpy as np
 import random
+import time
+from relevance_cache import RelevanceCache
+from scenarios import TEST_SCENARIOS
 
 SEARCH_METHODS = {
     "LIKE": "LIKE",
@@ -14,7 +21,14 @@ SEARCH_METHODS = {
     "Soundex": "Soundex",
     "Metaphone": "Metaphone",
     "FTS": "FTS",
-    "Hybrid": "Hybrid"
+    "Hybrid": "Hybrid",
+    "Trigram+Levenshtein": "Trigram+Levenshtein",
+    "Trigram KNN": "Trigram KNN",
+    "Word similarity": "Word similarity",
+    "PhoneticTokens": "PhoneticTokens",
+    "Py Trigram": "Py Trigram",
+    "Py SymSpell": "Py SymSpell",
+    "Py Soundex": "Py Soundex"
 }
 
 DB_CONFIG = {
@@ -25,6 +39,37 @@ DB_CONFIG = {
     'port': '5432'
 }
 
+# История бенчмарков дописывается в Parquet, секционированный по месяцу замера;
+# в состоянии хранится последний выгруженный id search_benchmarks и пропуски ниже него
+EXPORT_DIR = 'results/benchmarks'
+EXPORT_STATE = os.path.join(EXPORT_DIR, '_export_state.json')
+EXPORT_BATCH_ROWS = 100000
+# Пропуск в id, не заполнившийся за это время, считается откатом вставки, с
+EXPORT_GAP_TTL = 24 * 3600
+EXPORT_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('test_run_id', pa.string()),
+    ('method', pa.string()),
+    ('dataset_size', pa.int64()),
+    ('query_text', pa.string()),
+    ('execution_time_ms', pa.float64()),
+    ('result_count', pa.int64()),
+    ('index_used', pa.bool_()),
+    ('scenario', pa.string()),
+    ('cache_mode', pa.string()),
+    ('execution_mode', pa.string()),
+    ('parallel_workers', pa.int64()),
+    ('p50_ms', pa.float64()),
+    ('p95_ms', pa.float64()),
+    ('p99_ms', pa.float64()),
+    ('created_at', pa.timestamp('us')),
+    ('run_month', pa.string())
+])
+EXPORT_PARTITIONING = ds.partitioning(pa.schema([('run_month', pa.string())]), flavor='hive')
+
+# Отпечатки входных данных графиков: неизменившиеся графики не перерисовываются
+CHART_STATE = 'results/charts_state.json'
+
 
 def generate_demo_performance_data():
     """Генерация демо-данных о производительности"""
@@ -109,21 +154,126 @@ def generate_demo_error_metrics():
     return pd.DataFrame(data)
 
 
-def load_benchmark_data():
+def _read_state(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as state:
+        return json.load(state)
+
+
+def _write_state(path, data):
+    # Запись через временный файл, чтобы прерванный запуск не оставил испорченное состояние
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as state:
+        json.dump(data, state)
+    os.replace(f"{path}.tmp", path)
+
+
+def _cut_gap(gaps, row_id):
+    """Убирает выгруженный id из диапазона пропуска, разделяя диапазон на части"""
+    result = []
+    for low, high, noticed in gaps:
+        if not low <= row_id <= high:
+            result.append([low, high, noticed])
+            continue
+        if low < row_id:
+            result.append([low, row_id - 1, noticed])
+        if row_id < high:
+            result.append([row_id + 1, high, noticed])
+    return result
+
+
+def export_new_benchmarks(conn, export_dir=EXPORT_DIR):
+    """Дописывает в Parquet строки search_benchmarks, появившиеся после прошлой выгрузки"""
+    state_path = os.path.join(export_dir, os.path.basename(EXPORT_STATE))
+    state = _read_state(state_path)
+    last_id = state.get('last_id', 0)
+    # Диапазоны [lo, hi] id ниже last_id, которых еще не было в таблице: транзакция параллельного
+    # прогона или повторной загрузки из файла могла зафиксироваться позже строк с большими id
+    now = time.time()
+    gaps = [gap for gap in state.get('gaps', []) if now - gap[2] < EXPORT_GAP_TTL]
+    columns = [field.name for field in EXPORT_SCHEMA]
+    select_list = f"{', '.join(f'b.{column}' for column in columns[:-1])}, to_char(b.created_at, 'YYYY-MM')"
+    exported = 0
+
+    # Именованный курсор: новые строки читаются порциями, а не одним DataFrame; каждый
+    # пропуск читается отдельным диапазоном по первичному ключу
+    with conn.cursor(name='benchmark_export') as cursor:
+        cursor.itersize = EXPORT_BATCH_ROWS
+        cursor.execute(f"""
+                       SELECT {select_list}
+                       FROM search_benchmarks b
+                       WHERE b.id > %s
+                       UNION ALL
+                       SELECT {select_list}
+                       FROM unnest(%s::bigint[], %s::bigint[]) AS gap (lo, hi)
+                       JOIN search_benchmarks b ON b.id BETWEEN gap.lo AND gap.hi
+                       ORDER BY 1
+                       """, (last_id, [gap[0] for gap in gaps], [gap[1] for gap in gaps]))
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH_ROWS)
+            if not rows:
+                break
+
+            table = pa.Table.from_pandas(pd.DataFrame(rows, columns=columns), schema=EXPORT_SCHEMA,
+                                         preserve_index=False)
+            ds.write_dataset(table, export_dir, format='parquet', partitioning=EXPORT_PARTITIONING,
+                             basename_template=f"part-{rows[0][0]}-{{i}}.parquet",
+                             existing_data_behavior='overwrite_or_ignore')
+            # Каждый id выгружается один раз: найденный id вырезается из своего пропуска,
+            # а недостающие id между новыми строками становятся новым пропуском
+            for row in rows:
+                row_id = row[0]
+                if row_id <= last_id:
+                    gaps = _cut_gap(gaps, row_id)
+                    continue
+                if row_id > last_id + 1:
+                    gaps.append([last_id + 1, row_id - 1, now])
+                last_id = row_id
+            _write_state(state_path, {'last_id': last_id, 'gaps': gaps})
+            exported += len(rows)
+    conn.commit()
+    return exported
+
+
+def aggregate_benchmarks(export_dir=EXPORT_DIR, methods=None, since=None):
+    """Агрегирует выгруженную историю по методу и размеру набора данных"""
+    columns = ['method', 'dataset_size', 'avg_time', 'avg_results', 'median_time', 'index_usage']
+    if not os.path.isdir(export_dir):
+        return pd.DataFrame(columns=columns)
+
+    # Фильтр по месяцу отсекает целые секции, фильтр по методу - группы строк в файлах
+    condition = ds.field('method').isin(list(methods or SEARCH_METHODS))
+    if since:
+        condition &= ds.field('run_month') >= since
+    table = ds.dataset(export_dir, format='parquet', partitioning=EXPORT_PARTITIONING).to_table(
+        columns=['method', 'dataset_size', 'execution_time_ms', 'result_count', 'index_used'],
+        filter=condition
+    )
+    table = table.append_column('index_hit', pc.cast(table['index_used'], pa.float64()))
+
+    # Медиана приближенная (t-digest): точный перцентиль потребовал бы сортировки всей истории
+    df = table.group_by(['method', 'dataset_size']).aggregate([
+        ('execution_time_ms', 'mean'),
+        ('result_count', 'mean'),
+        ('execution_time_ms', 'approximate_median'),
+        ('index_hit', 'mean')
+    ]).to_pandas().rename(columns={
+        'execution_time_ms_mean': 'avg_time',
+        'result_count_mean': 'avg_results',
+        'execution_time_ms_approximate_median': 'median_time',
+        'index_hit_mean': 'index_usage'
+    })
+    df['index_usage'] *= 100.0
+    return df[columns]
+
+
+def load_benchmark_data(since=None):
     """Загрузка данных о производительности"""
     try:
         conn = psycopg2.connect(**DB_CONFIG)
-        query = """
-                SELECT method,
-                       dataset_size,
-                       AVG(execution_time_ms) as avg_time,
-                       AVG(result_count)      as avg_results,
-                       PERCENTILE_CONT(0.5)      WITHIN GROUP (ORDER BY execution_time_ms) as median_time,
-                       COUNT(*) FILTER (WHERE index_used) * 100.0 / COUNT(*) as index_usage
-                FROM search_benchmarks
-                GROUP BY method, dataset_size
-                """
-        return pd.read_sql(query, conn)
+        print(f"Выгружено новых замеров: {export_new_benchmarks(conn)}")
+        return aggregate_benchmarks(since=since)
     except Exception as e:
         print(f"Error loading benchmark data, using demo data: {e}")
         return generate_demo_performance_data()
@@ -131,43 +281,149 @@ def load_benchmark_data():
         if 'conn' in locals() and conn: conn.close()
 
 
-def calculate_precision_recall(search_term="laptop"):
-    """Расчет метрик точности"""
+# Эталон и найденные множества считаются одним запросом для всех пар (метод, запрос),
+# которые действительно выполнялись в выбранном прогоне: запрос, которого в прогоне не было,
+# не превращается в нулевые метрики.
+# Эталонные множества берутся из кэша relevance_sets текущей версии набора данных.
+# Условие по description не нужно: описание - это "Описание товара: " + name,
+# поэтому оно не добавляет совпадений
+ACCURACY_QUERY = """
+    WITH queries AS (
+        SELECT DISTINCT correct_term, typo_term, error_type
+        FROM unnest(%(correct_terms)s::text[], %(typo_terms)s::text[], %(error_types)s::text[])
+             AS q(correct_term, typo_term, error_type)
+    ),
+    relevant AS (
+        SELECT t.correct_term, unnest(rs.product_ids) AS product_id
+        FROM (SELECT DISTINCT correct_term FROM queries) t
+        JOIN relevance_sets rs ON rs.term = lower(t.correct_term)
+                              AND rs.dataset_version = %(dataset_version)s
+    ),
+    run AS (
+        -- По умолчанию берется последний прогон и его наибольший размер набора данных
+        SELECT test_run_id, MAX(dataset_size) AS dataset_size
+        FROM search_results
+        WHERE test_run_id = COALESCE(%(test_run_id)s::uuid,
+                                     (SELECT test_run_id
+                                      FROM search_benchmarks
+                                      ORDER BY created_at DESC
+                                      LIMIT 1))
+        GROUP BY test_run_id
+    ),
+    executed AS (
+        -- search_benchmarks содержит и пары с пустой выдачей, которых нет в search_results
+        SELECT DISTINCT b.method, b.query_text AS typo_term
+        FROM search_benchmarks b
+        JOIN run ON run.test_run_id = b.test_run_id AND run.dataset_size = b.dataset_size
+        WHERE b.method = ANY(%(methods)s)
+    ),
+    found AS (
+        SELECT DISTINCT r.method, r.query AS typo_term, r.product_id
+        FROM search_results r
+        JOIN run ON run.test_run_id = r.test_run_id AND run.dataset_size = r.dataset_size
+        WHERE r.method = ANY(%(methods)s)
+          AND r.query IN (SELECT typo_term FROM queries)
+    ),
+    relevant_counts AS (
+        SELECT correct_term, COUNT(*) AS relevant_count
+        FROM relevant
+        GROUP BY correct_term
+    ),
+    found_counts AS (
+        SELECT method, typo_term, COUNT(*) AS found_count
+        FROM found
+        GROUP BY method, typo_term
+    ),
+    hits AS (
+        SELECT q.correct_term, q.typo_term, f.method, COUNT(*) AS true_positives
+        FROM queries q
+        JOIN found f ON f.typo_term = q.typo_term
+        JOIN relevant r ON r.correct_term = q.correct_term AND r.product_id = f.product_id
+        GROUP BY q.correct_term, q.typo_term, f.method
+    )
+    SELECT q.error_type,
+           e.method,
+           q.correct_term,
+           q.typo_term,
+           COALESCE(rc.relevant_count, 0) AS relevant_count,
+           COALESCE(fc.found_count, 0)    AS found_count,
+           COALESCE(h.true_positives, 0)  AS true_positives
+    FROM queries q
+    JOIN executed e ON e.typo_term = q.typo_term
+    LEFT JOIN relevant_counts rc ON rc.correct_term = q.correct_term
+    LEFT JOIN found_counts fc ON fc.method = e.method AND fc.typo_term = q.typo_term
+    LEFT JOIN hits h ON h.method = e.method
+                    AND h.correct_term = q.correct_term
+                    AND h.typo_term = q.typo_term
+"""
+
+
+RUN_QUERIES_QUERY = """
+    SELECT DISTINCT query_text
+    FROM search_benchmarks
+    WHERE test_run_id = COALESCE(%(test_run_id)s::uuid,
+                                 (SELECT test_run_id
+                                  FROM search_benchmarks
+                                  ORDER BY created_at DESC
+                                  LIMIT 1))
+"""
+
+
+def evaluate_accuracy(conn, test_queries, test_run_id=None):
+    """Векторизованный расчет precision/recall/F1 по выдаче, сохраненной в search_results"""
+    # Эталоны нужны только для запросов, которые выполнялись в прогоне
+    with conn.cursor() as cursor:
+        cursor.execute(RUN_QUERIES_QUERY, {'test_run_id': test_run_id})
+        executed = {query for query, in cursor.fetchall()}
+    conn.commit()
+    test_queries = [query for query in test_queries if query[1] in executed]
+    if not test_queries:
+        raise ValueError("в прогоне нет запросов с известным правильным словом")
+
+    correct_terms, typo_terms, error_types = (list(column) for column in zip(*test_queries))
+    relevance = RelevanceCache(conn)
+    relevance.prefetch(correct_terms)
+
+    df = pd.read_sql(ACCURACY_QUERY, conn, params={
+        'correct_terms': correct_terms,
+        'typo_terms': typo_terms,
+        'error_types': error_types,
+        'methods': list(SEARCH_METHODS),
+        'test_run_id': test_run_id,
+        'dataset_version': relevance.version
+    })
+
+    true_positives = df['true_positives'].to_numpy(dtype=float)
+    found = df['found_count'].to_numpy(dtype=float)
+    relevant = df['relevant_count'].to_numpy(dtype=float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(found > 0, true_positives / found, 0.0)
+        recall = np.where(relevant > 0, true_positives / relevant, 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+
+    df['precision'] = precision
+    df['recall'] = recall
+    df['f1_score'] = f1
+    return df
+
+
+def load_known_queries(conn):
+    """Все известные пары (слово, запрос с опечаткой): встроенные сценарии раннера и test_queries"""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT correct_term, typo_term, error_type FROM test_queries")
+        test_queries = cursor.fetchall()
+    conn.commit()
+    return list(TEST_SCENARIOS) + test_queries
+
+
+def calculate_precision_recall(test_run_id=None):
+    """Расчет метрик точности, усредненных по запросам прогона"""
     try:
         conn = psycopg2.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-
-        cursor.execute("""
-                       SELECT id
-                       FROM products
-                       WHERE name ILIKE %s
-                          OR description ILIKE %s
-                       """, (f"%{search_term}%", f"%{search_term}%"))
-        relevant_ids = {row[0] for row in cursor.fetchall()}
-
-        metrics = []
-        for method in SEARCH_METHODS:
-            cursor.execute("""
-                           SELECT product_id
-                           FROM search_results
-                           WHERE method = %s
-                             AND query = %s
-                           """, (method, search_term))
-            found_ids = {row[0] for row in cursor.fetchall()}
-
-            true_positives = len(relevant_ids & found_ids)
-            precision = true_positives / len(found_ids) if found_ids else 0
-            recall = true_positives / len(relevant_ids) if relevant_ids else 0
-            f1 = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0
-
-            metrics.append({
-                'method': method,
-                'precision': precision,
-                'recall': recall,
-                'f1_score': f1
-            })
-
-        return pd.DataFrame(metrics)
+        df = evaluate_accuracy(conn, load_known_queries(conn), test_run_id)
+        return (df.groupby('method', as_index=False)[['precision', 'recall', 'f1_score']]
+                .mean())
 
     except Exception as e:
         print(f"Error calculating metrics, using demo data: {e}")
@@ -176,50 +432,13 @@ def calculate_precision_recall(search_term="laptop"):
         if 'conn' in locals() and conn: conn.close()
 
 
-def calculate_metrics_by_error_type():
+def calculate_metrics_by_error_type(test_run_id=None):
     """Расчет метрик по типам ошибок"""
     try:
         conn = psycopg2.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT correct_term, typo_term, error_type FROM test_queries")
-        test_queries = cursor.fetchall()
-
-        metrics = []
-        for correct_term, typo_term, error_type in test_queries:
-            cursor.execute("""
-                           SELECT id
-                           FROM products
-                           WHERE name ILIKE %s
-                              OR description ILIKE %s
-                           """, (f"%{correct_term}%", f"%{correct_term}%"))
-            relevant_ids = {row[0] for row in cursor.fetchall()}
-
-            for method in SEARCH_METHODS:
-                cursor.execute("""
-                               SELECT product_id
-                               FROM search_results
-                               WHERE method = %s
-                                 AND query = %s
-                               """, (method, typo_term))
-                found_ids = {row[0] for row in cursor.fetchall()}
-
-                true_positives = len(relevant_ids & found_ids)
-                precision = true_positives / len(found_ids) if found_ids else 0
-                recall = true_positives / len(relevant_ids) if relevant_ids else 0
-                f1 = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0
-
-                metrics.append({
-                    'error_type': error_type,
-                    'method': method,
-                    'precision': precision,
-                    'recall': recall,
-                    'f1_score': f1,
-                    'correct_term': correct_term,
-                    'typo_term': typo_term
-                })
-
-        return pd.DataFrame(metrics)
+        df = evaluate_accuracy(conn, load_known_queries(conn), test_run_id)
+        return df[['error_type', 'method', 'precision', 'recall', 'f1_score',
+                   'correct_term', 'typo_term']]
 
     except Exception as e:
         print(f"Error calculating error metrics, using demo data: {e}")
@@ -228,57 +447,85 @@ def calculate_metrics_by_error_type():
         if 'conn' in locals() and conn: conn.close()
 
 
-def generate_charts(df_perf, df_metrics, df_error_metrics):
+def _frame_digest(df):
+    return hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()
+
+
+def generate_charts(df_perf, df_metrics, df_error_metrics, force=False):
     """Генерация графиков и диаграмм"""
     try:
         os.makedirs("results", exist_ok=True)
 
-        plt.figure(figsize=(12, 6))
-        sns.lineplot(
-            data=df_perf,
-            x='dataset_size',
-            y='avg_time',
-            hue='method',
-            marker='o',
-            linewidth=2.5
-        )
-        plt.title('Среднее время выполнения запросов')
-        plt.xlabel('Размер набора данных')
-        plt.ylabel('Время (мс)')
-        plt.grid(True, linestyle='--', alpha=0.7)
-        plt.legend(title='Метод')
-        plt.savefig('results/performance.png', bbox_inches='tight', dpi=150)
-        plt.close()
-
-        plt.figure(figsize=(10, 6))
-        sns.barplot(
-            data=df_metrics,
-            x='method',
-            y='f1_score',
-            palette='viridis'
-        )
-        plt.title('Точность методов поиска (F1-score)')
-        plt.xlabel('Метод поиска')
-        plt.ylabel('F1-score')
-        plt.xticks(rotation=45)
-        plt.savefig('results/accuracy.png', bbox_inches='tight', dpi=150)
-        plt.close()
-
-        plt.figure(figsize=(10, 6))
-        pivot_data = df_perf.pivot_table(
-            index='method',
-            columns='dataset_size',
-            values='index_usage',
-            aggfunc='mean'
-        )
-        sns.heatmap(pivot_data, annot=True, fmt=".1f", cmap="YlGnBu")
-        plt.title('Процент использования индексов')
-        plt.xlabel('Размер набора данных')
-        plt.ylabel('Метод')
-        plt.savefig('results/index_usage.png', bbox_inches='tight', dpi=150)
-        plt.close()
-
-        if not df_error_metrics.empty:
+        digests = {
+            'performance.png': _frame_digest(df_perf),
+            'accuracy.png': _frame_digest(df_metrics),
+            'index_usage.png': _frame_digest(df_perf),
+            'error_types.png': _frame_digest(df_error_metrics)
+        }
+        state = _read_state(CHART_STATE)
+        stale = {
+            name for name, digest in digests.items()
+            if force or state.get(name) != digest or not os.path.exists(os.path.join('results', name))
+        }
+        if df_error_metrics.empty:
+            stale.discard('error_types.png')
+        if not stale:
+            print("Графики актуальны, перерисовка не требуется")
+            return
+
+        # matplotlib и seaborn загружаются только когда действительно нужно рисовать
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
+        if 'performance.png' in stale:
+            plt.figure(figsize=(12, 6))
+            sns.lineplot(
+                data=df_perf,
+                x='dataset_size',
+                y='avg_time',
+                hue='method',
+                marker='o',
+                linewidth=2.5
+            )
+            plt.title('Среднее время выполнения запросов')
+            plt.xlabel('Размер набора данных')
+            plt.ylabel('Время (мс)')
+            plt.grid(True, linestyle='--', alpha=0.7)
+            plt.legend(title='Метод')
+            plt.savefig('results/performance.png', bbox_inches='tight', dpi=150)
+            plt.close()
+
+        if 'accuracy.png' in stale:
+            plt.figure(figsize=(10, 6))
+            sns.barplot(
+                data=df_metrics,
+                x='method',
+                y='f1_score',
+                palette='viridis'
+            )
+            plt.title('Точность методов поиска (F1-score)')
+            plt.xlabel('Метод поиска')
+            plt.ylabel('F1-score')
+            plt.xticks(rotation=45)
+            plt.savefig('results/accuracy.png', bbox_inches='tight', dpi=150)
+            plt.close()
+
+        if 'index_usage.png' in stale:
+            plt.figure(figsize=(10, 6))
+            pivot_data = df_perf.pivot_table(
+                index='method',
+                columns='dataset_size',
+                values='index_usage',
+                aggfunc='mean'
+            )
+            sns.heatmap(pivot_data, annot=True, fmt=".1f", cmap="YlGnBu")
+            plt.title('Процент использования индексов')
+            plt.xlabel('Размер набора данных')
+            plt.ylabel('Метод')
+            plt.savefig('results/index_usage.png', bbox_inches='tight', dpi=150)
+            plt.close()
+
+        if 'error_types.png' in stale:
             plt.figure(figsize=(12, 7))
             sns.boxplot(
                 data=df_error_metrics,
@@ -294,6 +541,7 @@ def generate_charts(df_perf, df_metrics, df_error_metrics):
             plt.savefig('results/error_types.png', bbox_inches='tight', dpi=150)
             plt.close()
 
+        _write_state(CHART_STATE, {**state, **{name: digests[name] for name in stale}})
         print("Графики успешно сохранены в папку results/")
 
     except Exception as e:
@@ -315,15 +563,29 @@ def generate_report(df_perf, df_metrics, df_error_metrics):
         print(f"Ошибка при генерации отчета: {e}")
 
 
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Анализ результатов бенчмарков нечеткого поиска')
+    parser.add_argument('--run',
+                        help='test_run_id прогона для метрик точности (по умолчанию последний)')
+    parser.add_argument('--since',
+                        help='учитывать замеры начиная с месяца YYYY-MM')
+    parser.add_argument('--skip-charts', action='store_true',
+                        help='не строить графики (matplotlib не загружается)')
+    parser.add_argument('--force-charts', action='store_true',
+                        help='перерисовать графики, даже если входные данные не изменились')
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    args = parse_arguments()
     print("Загрузка данных о производительности...")
-    perf_data = load_benchmark_data()
+    perf_data = load_benchmark_data(args.since)
 
     print("Расчет метрик точности...")
-    metrics_data = calculate_precision_recall()
+    metrics_data = calculate_precision_recall(args.run)
 
     print("Анализ типов ошибок...")
-    error_metrics = calculate_metrics_by_error_type()
+    error_metrics = calculate_metrics_by_error_type(args.run)
 
     if not metrics_data.empty:
         metrics_melted = metrics_data.melt(
@@ -333,9 +595,9 @@ if __name__ == "__main__":
             value_name='value'
         )
 
-    print("Создание графиков...")
-    if not perf_data.empty and not metrics_data.empty:
-        generate_charts(perf_data, metrics_data, error_metrics)
+    if not args.skip_charts and not perf_data.empty and not metrics_data.empty:
+        print("Создание графиков...")
+        generate_charts(perf_data, metrics_data, error_metrics, args.force_charts)
 
     print("Формирование отчетов...")
     if not perf_data.empty and not metrics_data.empty and not error_metrics.empty:
@@ -0,0 +1,167 @@
+import argparse
+import math
+import sys
+import uuid
+import numpy as np
+from generate_data import connect_database
+
+# Параметры сравнения прогонов
+REGRESSION_THRESHOLD = 0.10
+SIGNIFICANCE_LEVEL = 0.01
+CONFIDENCE_LEVEL = 0.95
+BOOTSTRAP_ROUNDS = 2000
+
+# Коды завершения: 1 - найдена регрессия, 2 - прогоны нечего сравнивать
+EXIT_REGRESSION = 1
+EXIT_NO_DATA = 2
+
+# Замеры без samples_ms (до появления повторов) представлены средним временем
+SAMPLES_QUERY = """
+    SELECT test_run_id, method, query_text, dataset_size,
+           COALESCE(samples_ms, ARRAY[execution_time_ms]) AS samples
+    FROM search_benchmarks
+    WHERE test_run_id IN (%(baseline)s::uuid, %(candidate)s::uuid);
+"""
+
+
+def parse_run_id(value):
+    """Каноническая запись test_run_id: 32 шестнадцатеричные цифры в нижнем регистре"""
+    # UUID принимается с дефисами или без, в фигурных скобках и в любом регистре
+    return uuid.UUID(value).hex
+
+
+def load_run_samples(connection, baseline, candidate):
+    """Замеры двух прогонов по ключу (метод, запрос, размер набора данных)"""
+    baseline, candidate = parse_run_id(baseline), parse_run_id(candidate)
+    with connection.cursor() as cursor:
+        cursor.execute(SAMPLES_QUERY, {'baseline': baseline, 'candidate': candidate})
+        rows = cursor.fetchall()
+    connection.commit()
+
+    runs = {baseline: {}, candidate: {}}
+    for run_id, method, query, size, samples in rows:
+        # Один ключ может встречаться в прогоне несколько раз (повторы сценариев, уровни воркеров)
+        runs[parse_run_id(run_id)].setdefault((method, query, size), []).extend(samples)
+    return runs[baseline], runs[candidate]
+
+
+def _average_ranks(values):
+    """Ранги с усреднением для одинаковых значений и размеры групп совпадений"""
+    unique, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    upper = np.cumsum(counts)
+    return (upper - (counts - 1) / 2)[inverse], counts
+
+
+def mann_whitney(first, second):
+    """Двусторонний критерий Манна-Уитни в нормальном приближении с поправкой на совпадения"""
+    first = np.asarray(first, dtype=float)
+    second = np.asarray(second, dtype=float)
+    n1, n2 = len(first), len(second)
+    ranks, ties = _average_ranks(np.concatenate([first, second]))
+    u = ranks[:n1].sum() - n1 * (n1 + 1) / 2
+
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - (ties ** 3 - ties).sum() / (n * (n - 1)))
+    if variance <= 0:
+        return u, 1.0
+    # Поправка на непрерывность
+    z = (abs(u - n1 * n2 / 2) - 0.5) / math.sqrt(variance)
+    return u, math.erfc(max(z, 0.0) / math.sqrt(2))
+
+
+def compare_method(pairs, rounds=BOOTSTRAP_ROUNDS, confidence=CONFIDENCE_LEVEL, rng=None):
+    """Изменение задержки метода: среднее геометрическое отношений медиан по запросам,
+    бутстреп-интервал и p-значение по нормированным замерам"""
+    rng = rng or np.random.default_rng()
+    log_ratios = np.zeros(rounds)
+    point = 0.0
+    baseline_scaled, candidate_scaled = [], []
+    for baseline, candidate in pairs:
+        baseline = np.asarray(baseline, dtype=float)
+        candidate = np.asarray(candidate, dtype=float)
+        reference = np.median(baseline)
+        point += math.log(np.median(candidate) / reference)
+        # Повторы внутри запроса перевыбираются независимо в обоих прогонах
+        resampled_baseline = np.median(rng.choice(baseline, (rounds, len(baseline))), axis=1)
+        resampled_candidate = np.median(rng.choice(candidate, (rounds, len(candidate))), axis=1)
+        log_ratios += np.log(resampled_candidate / resampled_baseline)
+        # Нормировка на медиану базового прогона сводит запросы разной тяжести в одну шкалу
+        baseline_scaled.append(baseline / reference)
+        candidate_scaled.append(candidate / reference)
+
+    alpha = 1 - confidence
+    low, high = np.quantile(log_ratios / len(pairs), [alpha / 2, 1 - alpha / 2])
+    _, p_value = mann_whitney(np.concatenate(baseline_scaled), np.concatenate(candidate_scaled))
+    return {
+        'queries': len(pairs),
+        'delta': math.exp(point / len(pairs)) - 1,
+        'ci_low': math.exp(low) - 1,
+        'ci_high': math.exp(high) - 1,
+        'p_value': p_value
+    }
+
+
+def compare_runs(baseline_samples, candidate_samples, threshold=REGRESSION_THRESHOLD,
+                 significance=SIGNIFICANCE_LEVEL, rounds=BOOTSTRAP_ROUNDS, seed=None):
+    """Сравнивает прогоны по общим ключам; регрессия - значимое замедление больше threshold"""
+    rng = np.random.default_rng(seed)
+    by_method = {}
+    for key in sorted(baseline_samples.keys() & candidate_samples.keys()):
+        baseline, candidate = baseline_samples[key], candidate_samples[key]
+        # Нулевая медиана (выдача из кэша приложения) не дает осмысленного отношения
+        if np.median(baseline) > 0 and np.median(candidate) > 0:
+            by_method.setdefault(key[0], []).append((baseline, candidate))
+
+    results = {}
+    for method, pairs in by_method.items():
+        result = compare_method(pairs, rounds, rng=rng)
+        result['regression'] = result['delta'] > threshold and result['p_value'] < significance
+        results[method] = result
+    return results
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Сравнение задержек двух прогонов бенчмарка')
+    parser.add_argument('baseline', type=parse_run_id, help='test_run_id базового прогона')
+    parser.add_argument('candidate', type=parse_run_id, help='test_run_id проверяемого прогона')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='допустимое замедление метода, доля (0.1 - 10%%)')
+    parser.add_argument('--significance', type=float, default=SIGNIFICANCE_LEVEL,
+                        help='уровень значимости критерия Манна-Уитни')
+    parser.add_argument('--rounds', type=int, default=BOOTSTRAP_ROUNDS,
+                        help='число бутстреп-выборок для доверительного интервала')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed бутстрепа для воспроизводимых интервалов')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    db_conn = connect_database()
+    try:
+        baseline_samples, candidate_samples = load_run_samples(db_conn, args.baseline, args.candidate)
+    finally:
+        db_conn.close()
+
+    results = compare_runs(baseline_samples, candidate_samples, args.threshold,
+                           args.significance, args.rounds, args.seed)
+    if not results:
+        print("У прогонов нет общих пар (метод, запрос, размер набора данных)")
+        sys.exit(EXIT_NO_DATA)
+
+    print(f"Сравнение {args.candidate} с {args.baseline} "
+          f"(порог {args.threshold:.0%}, уровень значимости {args.significance:g})")
+    for method, result in sorted(results.items(), key=lambda item: -item[1]['delta']):
+        print(
+            f"  {method:<20} | "
+            f"Запросов: {result['queries']:<4} | "
+            f"Изменение: {result['delta']:>+7.1%} "
+            f"[{result['ci_low']:+.1%}; {result['ci_high']:+.1%}] | "
+            f"p: {result['p_value']:.2g}"
+            f"{' | РЕГРЕССИЯ' if result['regression'] else ''}"
+        )
+
+    regressions = [method for method, result in results.items() if result['regression']]
+    if regressions:
+        print(f"Регрессия методов: {', '.join(regressions)}")
+        sys.exit(EXIT_REGRESSION)
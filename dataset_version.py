@@ -0,0 +1,32 @@
+# Счетчик версии набора данных: увеличивается при каждой загрузке products
+# и служит отпечатком для кэшей, построенных по содержимому таблицы
+
+from schema import ensure_schema
+
+
+def get_dataset_version(connection) -> int:
+    """Читает версию набора данных без DDL и фиксации транзакции (0, если таблицы или строки нет)"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass('dataset_state') IS NOT NULL;")
+        if not cursor.fetchone()[0]:
+            return 0
+        cursor.execute("SELECT version FROM dataset_state WHERE id = 1;")
+        row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def bump_dataset_version(connection) -> int:
+    """Увеличивает версию набора данных после изменения products"""
+    ensure_schema(connection, ['dataset_state'])
+    with connection.cursor() as cursor:
+        cursor.execute("""
+                       INSERT INTO dataset_state (id, version)
+                       VALUES (1, 1)
+                       ON CONFLICT (id) DO UPDATE
+                           SET version = dataset_state.version + 1,
+                               updated_at = CURRENT_TIMESTAMP
+                       RETURNING version;
+                       """)
+        version = cursor.fetchone()[0]
+        connection.commit()
+    return version
@@ -0,0 +1,253 @@
+import json
+import psycopg2
+import threading
+from schema import ensure_schema
+
+# Интервал опроса событий ожидания, с
+SAMPLE_INTERVAL = 0.01
+
+# Инструкции методов поиска; служебные запросы раннера и профилировщика не учитываются
+STATEMENTS_QUERY = """
+    SELECT COALESCE(SUM(calls), 0),
+           COALESCE(SUM(total_exec_time), 0),
+           COALESCE(SUM(total_plan_time), 0),
+           COALESCE(SUM(shared_blks_hit), 0),
+           COALESCE(SUM(shared_blks_read), 0),
+           COALESCE(SUM(temp_blks_written), 0),
+           -- В PostgreSQL 17 blk_read_time переименован в shared_blk_read_time
+           COALESCE(SUM(COALESCE((to_jsonb(s) ->> 'shared_blk_read_time')::float,
+                                 (to_jsonb(s) ->> 'blk_read_time')::float)), 0)
+    FROM pg_stat_statements s
+    WHERE s.dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+      AND s.query ~* '\\mfrom\\s+products\\M'
+      AND s.query !~* '^\\s*(insert|update|delete|copy)';
+"""
+
+# Для секционированной products учитываются все секции; для обычной таблицы
+# pg_partition_tree строк не возвращает
+STATIO_QUERY = """
+    SELECT COALESCE(SUM(heap_blks_hit), 0),
+           COALESCE(SUM(heap_blks_read), 0),
+           COALESCE(SUM(idx_blks_hit), 0),
+           COALESCE(SUM(idx_blks_read), 0)
+    FROM pg_statio_user_tables
+    WHERE relid = 'products'::regclass
+       OR relid IN (SELECT relid FROM pg_partition_tree('products'));
+"""
+
+# pg_stat_io появился в PostgreSQL 16; время чтения заполняется при track_io_timing
+STAT_IO_QUERY = """
+    SELECT COALESCE(SUM(reads), 0), COALESCE(SUM(read_time), 0)
+    FROM pg_stat_io
+    WHERE backend_type IN ('client backend', 'background worker')
+      AND object = 'relation';
+"""
+
+# Серверный процесс раннера и его параллельные воркеры
+WAIT_EVENTS_QUERY = """
+    SELECT state, wait_event_type, wait_event
+    FROM pg_stat_activity
+    WHERE pid = %(pid)s OR leader_pid = %(pid)s;
+"""
+
+COUNTERS = (
+    'calls', 'exec_time_ms', 'plan_time_ms', 'shared_blks_hit', 'shared_blks_read', 'temp_blks_written',
+    'blk_read_time_ms', 'heap_blks_hit', 'heap_blks_read', 'idx_blks_hit', 'idx_blks_read',
+    'io_reads', 'io_read_time_ms'
+)
+
+CPU_SAMPLE = 'CPU'
+
+
+class MethodProfiler:
+    """Серверный профиль методов поиска: счетчики pg_stat_statements и pg_statio/pg_stat_io
+    до и после замеров и выборка событий ожидания pg_stat_activity отдельным соединением"""
+
+    def __init__(self, db_config, session_id, interval=SAMPLE_INTERVAL):
+        self.db_config = db_config
+        self.session_id = session_id
+        self.interval = interval
+        self.statements_available = False
+        self.stat_io_available = False
+        self.force_flush = False
+        # Метод -> накопленные разности счетчиков и число выборок по событиям ожидания
+        self.profiles = {}
+        self.method = None
+        self.suspended = None
+        self.pid = None
+        self.baseline = None
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.sampler = None
+
+    def setup(self, connection):
+        """Создает таблицу профилей и проверяет доступность статистических представлений"""
+        ensure_schema(connection, ['method_profiles'])
+        with connection.cursor() as cursor:
+            cursor.execute("SHOW server_version_num;")
+            version = int(cursor.fetchone()[0])
+            connection.commit()
+        self.stat_io_available = version >= 160000
+        # Накопленная статистика сбрасывается в общую память не чаще раза в секунду;
+        # pg_stat_force_next_flush (PostgreSQL 15) делает разности по методам точными
+        self.force_flush = version >= 150000
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_stat_statements;")
+                cursor.execute(STATEMENTS_QUERY)
+                connection.commit()
+            self.statements_available = True
+        except Exception as error:
+            # Представление работает, только если модуль указан в shared_preload_libraries
+            print(f"pg_stat_statements недоступен, время планирования и выполнения не собирается: {error}")
+            connection.rollback()
+
+    def _snapshot(self, connection):
+        with connection.cursor() as cursor:
+            if self.force_flush:
+                cursor.execute("SELECT pg_stat_force_next_flush();")
+                connection.commit()
+
+            values = [None] * 7
+            if self.statements_available:
+                cursor.execute(STATEMENTS_QUERY)
+                values = list(cursor.fetchone())
+            cursor.execute(STATIO_QUERY)
+            values += cursor.fetchone()
+            io = (None, None)
+            if self.stat_io_available:
+                cursor.execute(STAT_IO_QUERY)
+                io = cursor.fetchone()
+            values += io
+            connection.commit()
+        return dict(zip(COUNTERS, values))
+
+    def _profile(self, method):
+        return self.profiles.setdefault(method, {'counters': dict.fromkeys(COUNTERS), 'waits': {}})
+
+    def begin(self, connection, method):
+        """Фиксирует счетчики перед замерами метода и направляет выборки ожиданий в его профиль"""
+        self.baseline = self._snapshot(connection)
+        with self.lock:
+            self.pid = connection.get_backend_pid()
+            self.method = method
+        self._start_sampler()
+
+    def end(self, connection):
+        """Добавляет разности счетчиков с момента begin() к профилю текущего метода"""
+        with self.lock:
+            method, self.method = self.method, None
+        if method is not None:
+            self._accumulate(connection, method)
+
+    def suspend(self, connection):
+        """Закрывает окно текущего метода перед перезапуском сервера; resume() открывает его заново"""
+        with self.lock:
+            method, self.method = self.method, None
+        if method is not None:
+            self._accumulate(connection, method)
+        # Соединение выборки ожиданий рвется вместе с сервером
+        self.stop()
+        self.suspended = method
+
+    def resume(self, connection):
+        """Продолжает профиль метода на новом соединении: новый pid, базовые счетчики и выборка ожиданий"""
+        method, self.suspended = self.suspended, None
+        if method is not None:
+            self.begin(connection, method)
+
+    def _accumulate(self, connection, method):
+        snapshot = self._snapshot(connection)
+        counters = self._profile(method)['counters']
+        for name in COUNTERS:
+            if snapshot[name] is not None and self.baseline[name] is not None:
+                counters[name] = (counters[name] or 0) + snapshot[name] - self.baseline[name]
+
+    def _start_sampler(self):
+        if self.sampler and self.sampler.is_alive():
+            return
+        self.stop_event.clear()
+        self.sampler = threading.Thread(target=self._sample_waits, daemon=True)
+        self.sampler.start()
+
+    def _sample_waits(self):
+        connection = None
+        try:
+            connection = psycopg2.connect(**self.db_config)
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                while not self.stop_event.wait(self.interval):
+                    with self.lock:
+                        method, pid = self.method, self.pid
+                    if method is None:
+                        continue
+                    cursor.execute(WAIT_EVENTS_QUERY, {'pid': pid})
+                    # Процесс в ожидании клиента не выполняет запрос: время на стороне раннера
+                    keys = [
+                        f"{wait_type}:{wait_event}" if wait_type else CPU_SAMPLE
+                        for state, wait_type, wait_event in cursor.fetchall()
+                        if state == 'active'
+                    ]
+                    with self.lock:
+                        # Выборка, сделанная после end(), относится уже к следующему методу
+                        if not keys or method != self.method:
+                            continue
+                        waits = self._profile(method)['waits']
+                        for key in keys:
+                            waits[key] = waits.get(key, 0) + 1
+        except Exception as error:
+            print(f"Ошибка выборки событий ожидания: {error}")
+        finally:
+            if connection:
+                connection.close()
+
+    def stop(self):
+        if self.sampler:
+            self.stop_event.set()
+            self.sampler.join()
+            self.sampler = None
+
+    def save(self, connection, dataset_size):
+        """Записывает профили накопленных методов и начинает накопление заново"""
+        rows = []
+        for method, profile in self.profiles.items():
+            waits = profile['waits']
+            samples = sum(waits.values())
+            io_waits = sum(count for key, count in waits.items() if key.startswith('IO:'))
+            lock_waits = sum(count for key, count in waits.items() if key.startswith(('Lock:', 'LWLock:')))
+            cpu = waits.get(CPU_SAMPLE, 0)
+            shares = (
+                (cpu / samples, io_waits / samples, lock_waits / samples,
+                 (samples - cpu - io_waits - lock_waits) / samples)
+                if samples else (None, None, None, None)
+            )
+            counters = profile['counters']
+            if samples:
+                exec_time = f"{counters['exec_time_ms']:.0f} мс" if counters['exec_time_ms'] is not None else "-"
+                print(
+                    f"  {method:<20} | "
+                    f"Сервер: {exec_time:>9} | "
+                    f"CPU: {shares[0]:.0%} | "
+                    f"IO: {shares[1]:.0%} | "
+                    f"Блокировки: {shares[2]:.0%} | "
+                    f"Прочее: {shares[3]:.0%}"
+                )
+            rows.append((
+                self.session_id, method, dataset_size,
+                *(counters[name] for name in COUNTERS),
+                samples, *shares, json.dumps(waits)
+            ))
+
+        if rows:
+            with connection.cursor() as cursor:
+                cursor.executemany(f"""
+                                   INSERT INTO method_profiles (test_run_id, method, dataset_size,
+                                                                {', '.join(COUNTERS)}, samples, cpu_share,
+                                                                io_wait_share, lock_wait_share,
+                                                                other_wait_share, wait_events)
+                                   VALUES ({', '.join(['%s'] * (len(COUNTERS) + 9))})
+                                   """, rows)
+                connection.commit()
+        self.profiles = {}
+        return rows
@@ -1,114 +1,368 @@
-import psycopg2
-import secrets
-import uuid
-from random import choice, randint, random
-from faker import Faker
-from psycopg2.extras import execute_values
-
-# Параметры подключения к PostgreSQL
-CONFIG = {
-    'database': 'fuzzy_search_lab',
-    'user': 'postgres',
-    'password': '7842590Ff',
-    'address': 'localhost',
-    'port': 5432
-}
-
-# Глобальные константы
-PRODUCT_CATEGORIES = ['Gadgets', 'Apparel', 'Products', 'Books', 'Sport', 'Household', 'Playthings']
-MANUFACTURERS = ['CircuitInnovate', 'UrbanThreadsCo', 'FreshHarvestGoods', 'InkwellPublishers', 'TitanActive', 'HearthCrafters', 'DreamPlayLabs']
-SEARCH_TERMS = ['computer', 'monitor', 'keyboard', 'software', 'processor', 'adapter', 'mouse', 'windows']
-RECORD_COUNT = 5000
-
-
-def modify_text(input_str: str) -> str:
-    """Вносит случайные изменения в строку для имитации опечаток"""
-    if len(input_str) < 3:
-        return input_str
-
-    operations = {
-        'transpose': lambda s, i: s[:i] + s[i + 1] + s[i] + s[i + 2:],
-        'remove': lambda s, i: s[:i] + s[i + 1:],
-        'add': lambda s, i: s[:i] + secrets.choice('abcdefghijklmnopqrstuvwxyz') + s[i:],
-        'replace': lambda s, i: s[:i] + secrets.choice('abcdefghijklmnopqrstuvwxyz') + s[i + 1:]
-    }
-
-    operation = choice(list(operations.keys()))
-    position = randint(0, len(input_str) - 2 if operation == 'transpose' else len(input_str) - 1)
-    return operations[operation](input_str, position)
-
-
-def create_product_records(quantity: int) -> list[tuple]:
-    """Генерирует список продуктов со случайными данными"""
-    dataset = []
-    term_count = len(SEARCH_TERMS)
-
-    for idx in range(quantity):
-        term = SEARCH_TERMS[idx % term_count]
-        company = choice(MANUFACTURERS)
-        code = uuid.uuid4().hex[:6].upper()
-
-        product_name = f"{company} {term.title()} {fake.word().title()} {code}"
-
-        # Добавляем опечатки в 15% случаев
-        if random() < 0.15:
-            modified_term = modify_text(term)
-            product_name = product_name.lower().replace(term, modified_term)
-
-        dataset.append((
-            product_name,
-            f"Описание товара: {product_name}",
-            choice(PRODUCT_CATEGORIES),
-            company,
-            f"ID-{uuid.uuid4().hex[:8]}"
-        ))
-
-    return dataset
-
-
-def save_to_database(connection, records: list[tuple]):
-    """Сохраняет сгенерированные данные в базу"""
-    with connection.cursor() as cursor:
-        insert_command = """
-                         INSERT INTO products
-                             (name, description, category, brand, sku)
-                         VALUES %s \
-                         """
-        execute_values(cursor, insert_command, records)
-        connection.commit()
-        print(f"Добавлено записей: {len(records)}")
-
-
-def initialize_database():
-    """Основная функция инициализации данных"""
-    db_conn = None
-    try:
-        db_conn = psycopg2.connect(
-            dbname=CONFIG['database'],
-            user=CONFIG['user'],
-            password=CONFIG['password'],
-            host=CONFIG['address'],
-            port=CONFIG['port']
-        )
-
-        # Очистка существующих данных
-        with db_conn.cursor() as cursor:
-            cursor.execute("TRUNCATE TABLE products RESTART IDENTITY;")
-            db_conn.commit()
-
-        # Генерация и сохранение данных
-        print(f"Создание {RECORD_COUNT} товарных позиций...")
-        product_data = create_product_records(RECORD_COUNT)
-        save_to_database(db_conn, product_data)
-
-    except Exception as error:
-        print(f"Ошибка при работе с БД: {error}")
-    finally:
-        if db_conn:
-            db_conn.close()
-            print("Соединение с базой данных закрыто.")
-
-
-if __name__ == "__main__":
-    fake = Faker('ru_RU')
-    initialize_database()
\ No newline at end of file
+import argparse
+import io
+import numpy as np
+import psycopg2
+import re
+import secrets
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from random import choice, getrandbits, getstate, randint, seed as seed_random, setstate
+from faker import Faker
+from psycopg2.extras import execute_values
+from dataset_version import bump_dataset_version
+from typo_engine import DEFAULT_RATES, TypoEngine
+
+# Параметры подключения к PostgreSQL
+CONFIG = {
+    'database': 'fuzzy_search_lab',
+    'user': 'postgres',
+    'password': '7842590Ff',
+    'address': 'localhost',
+    'port': 5432
+}
+
+# Глобальные константы
+PRODUCT_CATEGORIES = ['Gadgets', 'Apparel', 'Products', 'Books', 'Sport', 'Household', 'Playthings']
+MANUFACTURERS = ['CircuitInnovate', 'UrbanThreadsCo', 'FreshHarvestGoods', 'InkwellPublishers', 'TitanActive', 'HearthCrafters', 'DreamPlayLabs']
+SEARCH_TERMS = ['computer', 'monitor', 'keyboard', 'software', 'processor', 'adapter', 'mouse', 'windows']
+RECORD_COUNT = 5000
+
+# Параметры потоковой загрузки
+CHUNK_SIZE = 50000
+INDEX_SCRIPT = '02_create_indexes.sql'
+COPY_COLUMNS = ('name', 'description', 'category', 'brand', 'sku')
+INDEX_NAME_PATTERN = re.compile(
+    r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?(\w+)',
+    re.IGNORECASE
+)
+
+# Параметры параллельной генерации: разбиение на шарды не зависит от числа
+# процессов, поэтому один и тот же --seed дает один и тот же набор данных
+SHARD_SIZE = 1000000
+SHARD_SEED_STRIDE = 1000003
+
+# Параметры пакетной генерации: доли операций опечаток и размер пакета
+TYPO_RATES = DEFAULT_RATES
+GENERATION_BATCH_SIZE = 10000
+
+
+def modify_text(input_str: str) -> str:
+    """Вносит случайные изменения в строку для имитации опечаток"""
+    if len(input_str) < 3:
+        return input_str
+
+    operations = {
+        'transpose': lambda s, i: s[:i] + s[i + 1] + s[i] + s[i + 2:],
+        'remove': lambda s, i: s[:i] + s[i + 1:],
+        'add': lambda s, i: s[:i] + choice('abcdefghijklmnopqrstuvwxyz') + s[i:],
+        'replace': lambda s, i: s[:i] + choice('abcdefghijklmnopqrstuvwxyz') + s[i + 1:]
+    }
+
+    operation = choice(list(operations.keys()))
+    position = randint(0, len(input_str) - 2 if operation == 'transpose' else len(input_str) - 1)
+    return operations[operation](input_str, position)
+
+
+def iter_product_records(quantity: int, start: int = 0,
+                         batch_size: int = GENERATION_BATCH_SIZE) -> Iterator[tuple]:
+    """Лениво генерирует продукты пакетами, не накапливая весь набор в памяти"""
+    engine = TypoEngine(TYPO_RATES, seed=getrandbits(64))
+    terms = np.array(SEARCH_TERMS)
+    companies = np.array(MANUFACTURERS)
+    categories = np.array(PRODUCT_CATEGORIES)
+    words = np.array(fake.get_words_list())
+
+    for batch_start in range(start, start + quantity, batch_size):
+        indexes = np.arange(batch_start, min(batch_start + batch_size, start + quantity))
+        size = len(indexes)
+
+        brands = companies[engine.rng.integers(0, len(companies), size)]
+        product_names, _ = engine.build_names(
+            brands,
+            terms[indexes % len(terms)],
+            words[engine.rng.integers(0, len(words), size)],
+            engine.hex_codes(size)
+        )
+
+        # Артикул строится от порядкового номера: случайные 8 hex-символов
+        # на десятках миллионов строк дают коллизии по UNIQUE(sku)
+        skus = np.char.add('ID-', np.char.zfill(indexes.astype(str), 10))
+
+        yield from zip(
+            product_names.tolist(),
+            np.char.add('Описание товара: ', product_names).tolist(),
+            categories[engine.rng.integers(0, len(categories), size)].tolist(),
+            brands.tolist(),
+            skus.tolist()
+        )
+
+
+def init_generator(seed: int | None = None):
+    """Создает генератор Faker и при необходимости фиксирует seed всех источников случайности"""
+    global fake
+    fake = Faker('ru_RU')
+    if seed is not None:
+        seed_random(seed)
+        fake.seed_instance(seed)
+
+
+@contextmanager
+def seeded_generator(seed: int):
+    """Временно фиксирует seed генератора и восстанавливает прежнее состояние random и Faker на выходе"""
+    state, previous = getstate(), globals().get('fake')
+    init_generator(seed)
+    try:
+        yield
+    finally:
+        setstate(state)
+        if previous is not None:
+            globals()['fake'] = previous
+
+
+def create_product_records(quantity: int) -> list[tuple]:
+    """Генерирует список продуктов со случайными данными"""
+    return list(iter_product_records(quantity))
+
+
+def save_to_database(connection, records: list[tuple]):
+    """Сохраняет сгенерированные данные в базу"""
+    with connection.cursor() as cursor:
+        insert_command = """
+                         INSERT INTO products
+                             (name, description, category, brand, sku)
+                         VALUES %s \
+                         """
+        execute_values(cursor, insert_command, records)
+        connection.commit()
+        print(f"Добавлено записей: {len(records)}")
+
+
+def connect_database():
+    """Открывает соединение с базой по параметрам CONFIG"""
+    return psycopg2.connect(
+        dbname=CONFIG['database'],
+        user=CONFIG['user'],
+        password=CONFIG['password'],
+        host=CONFIG['address'],
+        port=CONFIG['port']
+    )
+
+
+def _copy_field(value) -> str:
+    """Экранирует значение для текстового формата COPY"""
+    if value is None:
+        return r'\N'
+    return (str(value)
+            .replace('\\', '\\\\')
+            .replace('\t', '\\t')
+            .replace('\n', '\\n')
+            .replace('\r', '\\r'))
+
+
+def format_copy_row(record: Iterable) -> str:
+    """Формирует строку текстового формата COPY"""
+    return '\t'.join(map(_copy_field, record)) + '\n'
+
+
+def stream_to_database(connection, records: Iterable[tuple], chunk_size: int = CHUNK_SIZE,
+                       columns: tuple = COPY_COLUMNS, verbose: bool = True, table: str = 'products') -> int:
+    """Потоково загружает записи через COPY FROM STDIN порциями фиксированного размера"""
+    copy_command = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    records = iter(records)
+    total = 0
+    start_time = time.perf_counter()
+
+    with connection.cursor() as cursor:
+        while True:
+            # В памяти одновременно находится не больше одной порции
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+
+            buffer = io.StringIO()
+            for record in chunk:
+                buffer.write(format_copy_row(record))
+            buffer.seek(0)
+
+            cursor.copy_expert(copy_command, buffer)
+            connection.commit()
+
+            total += len(chunk)
+            if verbose:
+                elapsed = time.perf_counter() - start_time
+                print(f"  Загружено: {total} записей ({total / elapsed:,.0f} строк/с)")
+
+    elapsed = time.perf_counter() - start_time
+    if total and verbose:
+        print(f"Добавлено записей: {total} за {elapsed:.1f} с ({total / elapsed:,.0f} строк/с)")
+    return total
+
+
+def shard_seed(seed: int, shard: int) -> int:
+    """Детерминированно выводит seed шарда из общего seed"""
+    return seed * SHARD_SEED_STRIDE + shard
+
+
+def _load_shard(task: tuple) -> tuple[int, int, float]:
+    """Генерирует один шард в отдельном процессе и загружает его по собственному COPY-соединению"""
+    shard, start, quantity, seed, chunk_size = task
+    init_generator(shard_seed(seed, shard))
+
+    start_time = time.perf_counter()
+    connection = connect_database()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SET synchronous_commit TO off;")
+
+        # Идентификаторы задаются явно, чтобы не зависеть от порядка завершения воркеров
+        records = (
+            (start + offset + 1, *record)
+            for offset, record in enumerate(iter_product_records(quantity, start))
+        )
+        loaded = stream_to_database(connection, records, chunk_size, ('id', *COPY_COLUMNS), verbose=False)
+    finally:
+        connection.close()
+
+    return shard, loaded, time.perf_counter() - start_time
+
+
+def load_in_parallel(quantity: int, workers: int, seed: int,
+                     chunk_size: int = CHUNK_SIZE, shard_size: int = SHARD_SIZE) -> int:
+    """Распределяет генерацию по пулу процессов, каждый шард со своим seed"""
+    tasks = [
+        (shard, start, min(shard_size, quantity - start), seed, chunk_size)
+        for shard, start in enumerate(range(0, quantity, shard_size))
+    ]
+    print(f"Параллельная генерация: шардов {len(tasks)}, процессов {workers}, seed {seed}")
+
+    total = 0
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for shard, loaded, elapsed in executor.map(_load_shard, tasks):
+            total += loaded
+            print(f"  Шард {shard}: {loaded} записей за {elapsed:.1f} с "
+                  f"(всего {total}, {total / (time.perf_counter() - start_time):,.0f} строк/с)")
+
+    return total
+
+
+def read_index_definitions(path: str = INDEX_SCRIPT) -> list[tuple[str, str]]:
+    """Читает из SQL-скрипта пары (имя индекса, команда создания)"""
+    with open(path, encoding='utf-8') as script:
+        text = re.sub(r'--[^\n]*', '', script.read())
+
+    definitions = []
+    for statement in (part.strip() for part in text.split(';')):
+        match = INDEX_NAME_PATTERN.search(statement)
+        if match:
+            definitions.append((match.group(1), statement))
+    return definitions
+
+
+def drop_indexes(connection, definitions: list[tuple[str, str]]):
+    """Удаляет индексы перед массовой загрузкой"""
+    with connection.cursor() as cursor:
+        for index_name, _ in definitions:
+            cursor.execute(f"DROP INDEX IF EXISTS {index_name};")
+        connection.commit()
+    print(f"Удалено индексов: {len(definitions)}")
+
+
+def rebuild_indexes(connection, definitions: list[tuple[str, str]]):
+    """Пересоздает индексы после загрузки и обновляет статистику"""
+    with connection.cursor() as cursor:
+        for index_name, statement in definitions:
+            start_time = time.perf_counter()
+            cursor.execute(statement)
+            connection.commit()
+            print(f"  Индекс {index_name} построен за {time.perf_counter() - start_time:.1f} с")
+
+        cursor.execute("ANALYZE products;")
+        connection.commit()
+
+
+def initialize_database(quantity: int = RECORD_COUNT, stream: bool = False,
+                        chunk_size: int = CHUNK_SIZE, keep_indexes: bool = False,
+                        workers: int = 0, seed: int | None = None, shard_size: int = SHARD_SIZE):
+    """Основная функция инициализации данных"""
+    db_conn = None
+    try:
+        db_conn = connect_database()
+
+        # Очистка существующих данных
+        with db_conn.cursor() as cursor:
+            cursor.execute("TRUNCATE TABLE products RESTART IDENTITY;")
+            db_conn.commit()
+
+        # Новая версия набора данных делает недействительными построенные по нему кэши
+        bump_dataset_version(db_conn)
+
+        print(f"Создание {quantity} товарных позиций...")
+        if not stream and not workers:
+            # Генерация и сохранение данных
+            product_data = create_product_records(quantity)
+            save_to_database(db_conn, product_data)
+            return
+
+        # Индексы удаляются на время загрузки, а триггеры products остаются: вычисляемые
+        # столбцы иначе пришлось бы дозаполнять отдельным UPDATE по всей таблице
+        definitions = [] if keep_indexes else read_index_definitions()
+        if definitions:
+            drop_indexes(db_conn, definitions)
+
+        if workers:
+            # Шардам нужен общий seed; без --seed он выбирается случайно, как и при последовательной загрузке
+            if seed is None:
+                seed = secrets.randbits(32)
+                print(f"Seed не задан, выбран случайный: {seed} (для повтора укажите --seed {seed})")
+            load_in_parallel(quantity, workers, seed, chunk_size, shard_size)
+            with db_conn.cursor() as cursor:
+                cursor.execute("SELECT setval(pg_get_serial_sequence('products', 'id'), "
+                               "GREATEST((SELECT MAX(id) FROM products), 1));")
+                db_conn.commit()
+        else:
+            with db_conn.cursor() as cursor:
+                cursor.execute("SET synchronous_commit TO off;")
+
+            stream_to_database(db_conn, iter_product_records(quantity), chunk_size)
+
+        if definitions:
+            print("Восстановление индексов...")
+            rebuild_indexes(db_conn, definitions)
+
+    except Exception as error:
+        print(f"Ошибка при работе с БД: {error}")
+    finally:
+        if db_conn:
+            db_conn.close()
+            print("Соединение с базой данных закрыто.")
+
+
+def parse_arguments():
+    """Разбирает параметры командной строки"""
+    parser = argparse.ArgumentParser(description='Генерация тестовых данных для нечеткого поиска')
+    parser.add_argument('--count', type=int, default=RECORD_COUNT,
+                        help='количество генерируемых товаров')
+    parser.add_argument('--stream', action='store_true',
+                        help='потоковая загрузка через COPY FROM STDIN')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help='размер порции COPY в режиме --stream')
+    parser.add_argument('--keep-indexes', action='store_true',
+                        help='не удалять индексы на время потоковой загрузки')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='число процессов для параллельной генерации (0 - без пула)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed для воспроизводимой генерации набора данных')
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE,
+                        help='размер шарда при параллельной генерации')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    init_generator(args.seed)
+    initialize_database(args.count, args.stream, args.chunk_size, args.keep_indexes,
+                        args.workers, args.seed, args.shard_size)
@@ -0,0 +1,158 @@
+import io
+import time
+from psycopg2 import sql
+from generate_data import (COPY_COLUMNS, format_copy_row, iter_product_records, read_index_definitions,
+                           rebuild_indexes, seeded_generator)
+from schema import ensure_schema
+
+# Параметры замера стоимости индексов
+MAINTENANCE_WORK_MEM_LEVELS = ['64MB', '256MB', '1GB']
+INSERT_ROWS = 20000
+# Артикулы вставляемых строк берутся далеко за пределами сгенерированного набора,
+# чтобы не пересекаться с UNIQUE(sku) существующих товаров
+INSERT_SKU_OFFSET = 9000000000
+
+
+class IndexBuildBenchmark:
+    """Стоимость каждого индекса из 02_create_indexes.sql: время построения, объем и замедление вставки"""
+
+    def __init__(self, db_config, session_id, insert_rows=INSERT_ROWS):
+        self.db_config = db_config
+        self.session_id = session_id
+        self.insert_rows = insert_rows
+
+    def _ensure_schema(self, connection):
+        ensure_schema(connection, ['index_benchmarks'])
+
+    def _insert_buffer(self):
+        # Строки генерируются один раз заранее: в замер попадает только COPY;
+        # seed фиксируется только на время пакета, генератор процесса остается прежним
+        with seeded_generator(0):
+            records = iter_product_records(self.insert_rows, INSERT_SKU_OFFSET)
+            return ''.join(format_copy_row(record) for record in records)
+
+    def _vacuum(self, connection):
+        # VACUUM нельзя выполнять внутри транзакции
+        connection.autocommit = True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("VACUUM products;")
+        finally:
+            connection.autocommit = False
+
+    def _measure_insert(self, connection, payload):
+        """Скорость вставки порции строк с фиксацией в строках в секунду; строки затем удаляются"""
+        copy_command = f"COPY products ({', '.join(COPY_COLUMNS)}) FROM STDIN"
+        with connection.cursor() as cursor:
+            # В замер входит COMMIT: сброс WAL на диск - часть стоимости вставки
+            start_time = time.perf_counter()
+            cursor.copy_expert(copy_command, io.StringIO(payload))
+            connection.commit()
+            elapsed = time.perf_counter() - start_time
+
+            cursor.execute("DELETE FROM products WHERE sku >= %s AND sku < %s;", (
+                f"ID-{INSERT_SKU_OFFSET:010d}", f"ID-{INSERT_SKU_OFFSET + self.insert_rows:010d}"
+            ))
+            connection.commit()
+        # Удаление оставляет мертвые версии строк и записи индексов; их убирает VACUUM
+        self._vacuum(connection)
+        return self.insert_rows / elapsed
+
+    def _build(self, connection, index_name, statement, work_mem):
+        with connection.cursor() as cursor:
+            cursor.execute(sql.SQL("SET maintenance_work_mem = {};").format(sql.Literal(work_mem)))
+            start_time = time.perf_counter()
+            cursor.execute(statement)
+            connection.commit()
+            build_time_ms = (time.perf_counter() - start_time) * 1000
+
+            # Индекс секционированной products хранится в индексах секций; для обычного
+            # индекса pg_partition_tree строк не возвращает
+            cursor.execute("""
+                           SELECT am.amname,
+                                  (SELECT SUM(pg_relation_size(i.oid))::bigint
+                                   FROM pg_class i
+                                   WHERE i.oid = c.oid
+                                      OR i.oid IN (SELECT relid FROM pg_partition_tree(c.oid)))
+                           FROM pg_class c
+                           JOIN pg_am am ON am.oid = c.relam
+                           WHERE c.relname = %s;
+                           """, (index_name,))
+            access_method, index_bytes = cursor.fetchone()
+            connection.commit()
+        return access_method, build_time_ms, index_bytes
+
+    def _drop(self, connection, index_name):
+        with connection.cursor() as cursor:
+            cursor.execute(sql.SQL("DROP INDEX IF EXISTS {};").format(sql.Identifier(index_name)))
+            connection.commit()
+
+    def _save_results(self, connection, rows):
+        with connection.cursor() as cursor:
+            cursor.executemany("""
+                               INSERT INTO index_benchmarks (test_run_id, index_name, access_method,
+                                                             dataset_size, maintenance_work_mem,
+                                                             build_time_ms, index_bytes, insert_rows,
+                                                             insert_rows_per_s, baseline_rows_per_s,
+                                                             insert_slowdown)
+                               VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                               """, rows)
+            connection.commit()
+
+    def run(self, connection, work_mem_levels=MAINTENANCE_WORK_MEM_LEVELS, definitions=None):
+        """Строит каждый индекс по отдельности при каждом maintenance_work_mem и восстанавливает все индексы"""
+        definitions = definitions or read_index_definitions()
+        self._ensure_schema(connection)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(id) FROM products;")
+            dataset_size = cursor.fetchone()[0]
+        connection.commit()
+
+        payload = self._insert_buffer()
+        print(f"\nСтоимость индексов: {len(definitions)} индексов, {dataset_size} записей, "
+              f"maintenance_work_mem {', '.join(work_mem_levels)}")
+        try:
+            for index_name, _ in definitions:
+                self._drop(connection, index_name)
+            # Базовая скорость вставки: остаются только первичный ключ и UNIQUE(sku)
+            baseline = self._measure_insert(connection, payload)
+            print(f"  Вставка без индексов: {baseline:,.0f} строк/с")
+
+            for index_name, statement in definitions:
+                builds = []
+                for position, work_mem in enumerate(work_mem_levels):
+                    if position:
+                        self._drop(connection, index_name)
+                    builds.append((work_mem, *self._build(connection, index_name, statement, work_mem)))
+
+                # Замедление вставки не зависит от maintenance_work_mem: замеряется один раз
+                # с последним построенным индексом и записывается во все его строки
+                rate = self._measure_insert(connection, payload)
+                slowdown = baseline / rate
+                self._drop(connection, index_name)
+
+                self._save_results(connection, [
+                    (self.session_id, index_name, access_method, dataset_size, work_mem,
+                     build_time_ms, index_bytes, self.insert_rows, rate, baseline, slowdown)
+                    for work_mem, access_method, build_time_ms, index_bytes in builds
+                ])
+                timings = ', '.join(f"{work_mem}: {build_time_ms / 1000:.1f} с"
+                                    for work_mem, _, build_time_ms, _ in builds)
+                print(
+                    f"  {index_name:<32} | "
+                    f"Построение: {timings} | "
+                    f"Размер: {builds[-1][3] / 1024 ** 2:,.1f} МБ | "
+                    f"Вставка: {rate:,.0f} строк/с (x{slowdown:.2f})"
+                )
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute("RESET maintenance_work_mem;")
+                connection.commit()
+            print("Восстановление индексов...")
+            rebuild_indexes(connection, [
+                (index_name, statement.replace('CREATE INDEX', 'CREATE INDEX IF NOT EXISTS', 1))
+                for index_name, statement in definitions
+            ])
@@ -0,0 +1,207 @@
+import json
+import numpy as np
+import psycopg2
+import time
+from concurrent.futures import ThreadPoolExecutor
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+from schema import ensure_schema
+
+# Параметры нагрузочного режима
+LOAD_DURATION = 30
+# Уровень N требует N + 1 соединений; при стандартном max_connections = 100 уровень 128 недоступен
+CONCURRENCY_LEVELS = [1, 8, 32, 64]
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+# Пауза перед повторным подключением после отказа соединения, удваивается до предела
+CONNECT_RETRY_DELAY = 0.05
+CONNECT_RETRY_MAX_DELAY = 1.0
+
+
+class LoadGenerator:
+    """Нагрузка методов поиска от N параллельных клиентов с пулом соединений"""
+
+    def __init__(self, db_config, session_id, duration=LOAD_DURATION, target_rate=0.0):
+        self.db_config = db_config
+        self.session_id = session_id
+        self.duration = duration
+        # target_rate - суммарная целевая частота запросов в секунду; 0 - замкнутый цикл
+        self.target_rate = target_rate
+
+    def _ensure_schema(self, connection):
+        ensure_schema(connection, ['load_test_results'])
+
+    def _available_connections(self, connection):
+        """Сколько еще клиентских соединений примет сервер"""
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                           SELECT current_setting('max_connections')::int
+                                  - current_setting('superuser_reserved_connections')::int
+                                  - (SELECT COUNT(*) FROM pg_stat_activity WHERE backend_type = 'client backend')
+                           """)
+            available = cursor.fetchone()[0]
+        connection.commit()
+        return available
+
+    def _worker(self, pool, query, terms, worker_id, concurrency, stop_at):
+        latencies = []
+        errors = 0
+        interval = concurrency / self.target_rate if self.target_rate else 0.0
+        # Разносим старты клиентов, чтобы не получить залп запросов в первую миллисекунду
+        scheduled = time.perf_counter() + interval * worker_id / concurrency
+        position = worker_id
+        retry_delay = CONNECT_RETRY_DELAY
+
+        connection = None
+        try:
+            while True:
+                if interval:
+                    delay = scheduled - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                started = scheduled if interval else time.perf_counter()
+                if started >= stop_at:
+                    break
+
+                try:
+                    # Соединение берется заново, если прежнее было разорвано
+                    if connection is None:
+                        connection = pool.getconn()
+                    with connection.cursor() as cursor:
+                        cursor.execute(query, {'term': terms[position % len(terms)]})
+                        cursor.fetchall()
+                    # В открытом цикле задержка отсчитывается от планового старта,
+                    # чтобы очередь на стороне клиента не скрывала деградацию
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    retry_delay = CONNECT_RETRY_DELAY
+                except (psycopg2.OperationalError, psycopg2.InterfaceError, PoolError):
+                    # Отказ в соединении или его обрыв - тоже ошибка запроса, а не остановка клиента
+                    errors += 1
+                    if connection is not None:
+                        pool.putconn(connection, close=True)
+                        connection = None
+                    # Без паузы замкнутый цикл при недоступном сервере превращается в шквал
+                    # мгновенных отказов, и счетчик ошибок растет со скоростью попыток подключения
+                    time.sleep(max(0.0, min(retry_delay, stop_at - time.perf_counter())))
+                    retry_delay = min(retry_delay * 2, CONNECT_RETRY_MAX_DELAY)
+                except Exception:
+                    errors += 1
+                    if connection.closed:
+                        pool.putconn(connection, close=True)
+                        connection = None
+                    else:
+                        connection.rollback()
+
+                position += concurrency
+                scheduled += interval
+        finally:
+            if connection is not None:
+                pool.putconn(connection, close=bool(connection.closed))
+
+        return latencies, errors
+
+    def run_level(self, pool, method, query, terms, concurrency):
+        latencies = []
+        errors = 0
+
+        started = time.perf_counter()
+        stop_at = started + self.duration
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [
+                executor.submit(self._worker, pool, query, terms, worker_id, concurrency, stop_at)
+                for worker_id in range(concurrency)
+            ]
+            for future in futures:
+                worker_latencies, worker_errors = future.result()
+                latencies.extend(worker_latencies)
+                errors += worker_errors
+        elapsed = time.perf_counter() - started
+
+        return self._summarize(method, concurrency, elapsed, latencies, errors)
+
+    def _summarize(self, method, concurrency, elapsed, latencies, errors):
+        timings = np.asarray(latencies, dtype=float)
+        requests = len(timings) + errors
+        bins = [0.0, *LATENCY_BUCKETS_MS, float('inf')]
+        counts, _ = np.histogram(timings, bins=bins)
+        histogram = {
+            (f"<={upper:g}" if np.isfinite(upper) else f">{LATENCY_BUCKETS_MS[-1]:g}"): int(count)
+            for upper, count in zip(bins[1:], counts)
+        }
+
+        if len(timings):
+            p50, p95, p99 = (float(value) for value in np.percentile(timings, [50, 95, 99]))
+            max_ms = float(timings.max())
+        else:
+            p50 = p95 = p99 = max_ms = None
+
+        return {
+            'method': method,
+            'concurrency': concurrency,
+            'duration_s': elapsed,
+            'requests': requests,
+            'errors': errors,
+            'throughput_qps': len(timings) / elapsed if elapsed else 0.0,
+            'error_rate': errors / requests if requests else 0.0,
+            'p50_ms': p50,
+            'p95_ms': p95,
+            'p99_ms': p99,
+            'max_ms': max_ms,
+            'latency_histogram': histogram
+        }
+
+    def _save_result(self, connection, result, dataset_size):
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                           INSERT INTO load_test_results (test_run_id, method, dataset_size, concurrency,
+                                                          target_rate, duration_s, requests, errors,
+                                                          throughput_qps, error_rate, p50_ms, p95_ms,
+                                                          p99_ms, max_ms, latency_histogram)
+                           VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                           """, (
+                self.session_id, result['method'], dataset_size, result['concurrency'],
+                self.target_rate, result['duration_s'], result['requests'], result['errors'],
+                result['throughput_qps'], result['error_rate'], result['p50_ms'], result['p95_ms'],
+                result['p99_ms'], result['max_ms'], json.dumps(result['latency_histogram'])
+            ))
+            connection.commit()
+
+    def run(self, search_queries, terms, concurrency_levels=CONCURRENCY_LEVELS):
+        """Прогоняет каждый скомпилированный запрос на каждом уровне параллелизма и сохраняет результаты"""
+        max_concurrency = max(concurrency_levels)
+        pool = ThreadedConnectionPool(1, max_concurrency + 1, **self.db_config)
+        control_conn = pool.getconn()
+        results = []
+        try:
+            self._ensure_schema(control_conn)
+            with control_conn.cursor() as cursor:
+                cursor.execute("SELECT COUNT(id) FROM products;")
+                dataset_size = cursor.fetchone()[0]
+
+            # Уровень, для которого серверу не хватит соединений, не запускается вовсе
+            available = self._available_connections(control_conn)
+            skipped = [level for level in concurrency_levels if level > available]
+            if skipped:
+                print(f"Пропущены уровни {', '.join(map(str, skipped))}: сервер примет еще "
+                      f"{available} соединений (max_connections)")
+            concurrency_levels = [level for level in concurrency_levels if level <= available]
+
+            mode = f"{self.target_rate:g} запр/с" if self.target_rate else "замкнутый цикл"
+            print(f"\nНагрузочный тест: {self.duration} с на уровень, {mode}")
+            for method_name, query in search_queries.items():
+                for concurrency in concurrency_levels:
+                    result = self.run_level(pool, method_name, query, terms, concurrency)
+                    self._save_result(control_conn, result, dataset_size)
+                    results.append(result)
+
+                    p99 = f"{result['p99_ms']:.1f}" if result['p99_ms'] is not None else "-"
+                    print(
+                        f"  {method_name:<12} | "
+                        f"Клиентов: {concurrency:<4} | "
+                        f"QPS: {result['throughput_qps']:>8.1f} | "
+                        f"p99: {p99:>7} мс | "
+                        f"Ошибки: {result['error_rate']:.1%}"
+                    )
+        finally:
+            pool.putconn(control_conn)
+            pool.closeall()
+
+        return results
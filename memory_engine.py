@@ -0,0 +1,230 @@
+import re
+import sys
+import time
+from array import array
+
+import numpy as np
+
+# Порог доли совпавших триграмм; совпадает с pg_trgm.word_similarity_threshold в DB_CONFIG
+TRIGRAM_THRESHOLD = 0.4
+MAX_EDIT_DISTANCE = 2
+LOAD_ITERSIZE = 100000
+
+TOKEN_PATTERN = re.compile(r'\w+')
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'), **dict.fromkeys('cgjkqsxz', '2'),
+    **dict.fromkeys('dt', '3'), 'l': '4', **dict.fromkeys('mn', '5'), 'r': '6'
+}
+
+
+def tokenize(text):
+    """Разбивает строку на слова в нижнем регистре"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def word_trigrams(word):
+    """Триграммы слова с дополнением пробелами, как в pg_trgm"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def soundex(word):
+    """Код Soundex латинского слова; для остальных слов - пустая строка"""
+    letters = [char for char in word.lower() if 'a' <= char <= 'z']
+    if not letters:
+        return ''
+
+    code = letters[0].upper()
+    previous = SOUNDEX_CODES.get(letters[0], '')
+    for char in letters[1:]:
+        digit = SOUNDEX_CODES.get(char, '')
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # h и w не разделяют одинаковые коды, гласные - разделяют
+        if char not in 'hw':
+            previous = digit
+    return code.ljust(4, '0')
+
+
+def deletes(word, distance=MAX_EDIT_DISTANCE):
+    """Все варианты слова с удалением до distance символов (словарь SymSpell)"""
+    variants = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {item[:i] + item[i + 1:] for item in frontier for i in range(len(item))}
+        variants |= frontier
+    return variants
+
+
+def levenshtein_within(first, second, limit):
+    """Расстояние Левенштейна, если оно не больше limit, иначе None"""
+    if abs(len(first) - len(second)) > limit:
+        return None
+
+    previous = list(range(len(second) + 1))
+    for i, char in enumerate(first, start=1):
+        current = [i]
+        for j, other in enumerate(second, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other)))
+        if min(current) > limit:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= limit else None
+
+
+class CompactPostings:
+    """Постинг-листы в формате CSR: смещения по ключу и общий массив значений int32"""
+
+    def __init__(self, keys, values, key_count):
+        keys = np.frombuffer(keys, dtype=np.int32) if isinstance(keys, array) else np.asarray(keys, np.int32)
+        values = np.frombuffer(values, dtype=np.int32) if isinstance(values, array) else np.asarray(values, np.int32)
+        order = np.argsort(keys, kind='stable')
+        self.values = values[order]
+        self.offsets = np.zeros(key_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys, minlength=key_count), out=self.offsets[1:])
+
+    def get(self, key):
+        return self.values[self.offsets[key]:self.offsets[key + 1]]
+
+    def get_many(self, keys):
+        parts = [self.get(key) for key in keys]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int32)
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.offsets.nbytes
+
+
+def _dict_footprint(mapping):
+    return sys.getsizeof(mapping) + sum(sys.getsizeof(key) for key in mapping)
+
+
+class InMemorySearchEngine:
+    """Прикладной нечеткий поиск по products.name: триграммы, SymSpell и Soundex в памяти процесса"""
+
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int32)
+        self.build_stats = {}
+
+    def _load_names(self, connection):
+        # Именованный курсор не держит всю таблицу в памяти клиента
+        ids = array('i')
+        names = []
+        with connection.cursor(name='memory_engine_load') as cursor:
+            cursor.itersize = LOAD_ITERSIZE
+            cursor.execute("SELECT id, name FROM products ORDER BY id;")
+            for product_id, name in cursor:
+                ids.append(product_id)
+                names.append(name)
+        connection.commit()
+        return np.frombuffer(ids, dtype=np.int32).copy(), names
+
+    def build(self, connection):
+        """Загружает названия один раз и строит все индексы, замеряя время и объем каждого"""
+        start_time = time.perf_counter()
+        self.ids, names = self._load_names(connection)
+        self.build_stats['load'] = ((time.perf_counter() - start_time) * 1000, self.ids.nbytes)
+
+        start_time = time.perf_counter()
+        self.trigram_ids = {}
+        self.token_ids = {}
+        trigram_keys, trigram_docs = array('i'), array('i')
+        token_keys, token_docs = array('i'), array('i')
+        for doc, name in enumerate(names):
+            tokens = set(tokenize(name))
+            grams = set()
+            for token in tokens:
+                token_keys.append(self.token_ids.setdefault(token, len(self.token_ids)))
+                token_docs.append(doc)
+                grams |= word_trigrams(token)
+            for gram in grams:
+                trigram_keys.append(self.trigram_ids.setdefault(gram, len(self.trigram_ids)))
+                trigram_docs.append(doc)
+        del names
+
+        self.trigram_postings = CompactPostings(trigram_keys, trigram_docs, len(self.trigram_ids))
+        self.token_postings = CompactPostings(token_keys, token_docs, len(self.token_ids))
+        del trigram_keys, trigram_docs, token_keys, token_docs
+        self.build_stats['trigram'] = (
+            (time.perf_counter() - start_time) * 1000,
+            self.trigram_postings.nbytes + self.token_postings.nbytes
+            + _dict_footprint(self.trigram_ids) + _dict_footprint(self.token_ids)
+        )
+
+        # Словарь удалений и фонетические ключи строятся только по буквенным словам:
+        # артикулы вида 3FA2B1 уникальны почти для каждой строки и раздувают словарь
+        start_time = time.perf_counter()
+        self.tokens = [None] * len(self.token_ids)
+        for token, token_id in self.token_ids.items():
+            self.tokens[token_id] = token
+
+        self.delete_ids = {}
+        delete_keys, delete_tokens = array('i'), array('i')
+        for token_id, token in enumerate(self.tokens):
+            if token.isalpha():
+                for variant in deletes(token):
+                    delete_keys.append(self.delete_ids.setdefault(variant, len(self.delete_ids)))
+                    delete_tokens.append(token_id)
+        self.delete_postings = CompactPostings(delete_keys, delete_tokens, len(self.delete_ids))
+        self.build_stats['symspell'] = (
+            (time.perf_counter() - start_time) * 1000,
+            self.delete_postings.nbytes + _dict_footprint(self.delete_ids)
+        )
+
+        start_time = time.perf_counter()
+        self.phonetic_ids = {}
+        phonetic_keys, phonetic_tokens = array('i'), array('i')
+        for token_id, token in enumerate(self.tokens):
+            code = soundex(token) if token.isalpha() else ''
+            if code:
+                phonetic_keys.append(self.phonetic_ids.setdefault(code, len(self.phonetic_ids)))
+                phonetic_tokens.append(token_id)
+        self.phonetic_postings = CompactPostings(phonetic_keys, phonetic_tokens, len(self.phonetic_ids))
+        self.build_stats['phonetic'] = (
+            (time.perf_counter() - start_time) * 1000,
+            self.phonetic_postings.nbytes + _dict_footprint(self.phonetic_ids)
+        )
+        return self.build_stats
+
+    def _documents(self, token_ids):
+        docs = np.unique(self.token_postings.get_many(token_ids))
+        return [(int(product_id), None) for product_id in self.ids[docs]]
+
+    def search_trigram(self, term):
+        """Товары, содержащие не меньше TRIGRAM_THRESHOLD триграмм запроса, по убыванию доли"""
+        grams = set()
+        for token in tokenize(term):
+            grams |= word_trigrams(token)
+        if not grams:
+            return []
+
+        keys = [self.trigram_ids[gram] for gram in grams if gram in self.trigram_ids]
+        docs, counts = np.unique(self.trigram_postings.get_many(keys), return_counts=True)
+        scores = counts / len(grams)
+        selected = np.flatnonzero(scores >= TRIGRAM_THRESHOLD)
+        selected = selected[np.argsort(-scores[selected], kind='stable')]
+        return list(zip(self.ids[docs[selected]].tolist(), scores[selected].tolist()))
+
+    def search_edit_distance(self, term, limit=MAX_EDIT_DISTANCE):
+        """Товары со словом на расстоянии Левенштейна не больше limit (поиск по словарю удалений)"""
+        word = term.lower()
+        keys = [self.delete_ids[variant] for variant in deletes(word, limit) if variant in self.delete_ids]
+        candidates = np.unique(self.delete_postings.get_many(keys))
+        matched = [
+            token_id for token_id in candidates.tolist()
+            if levenshtein_within(self.tokens[token_id], word, limit) is not None
+        ]
+        return self._documents(matched)
+
+    def search_phonetic(self, term):
+        """Товары со словом, совпадающим с запросом по коду Soundex"""
+        code = soundex(term)
+        if code not in self.phonetic_ids:
+            return []
+        return self._documents(self.phonetic_postings.get(self.phonetic_ids[code]).tolist())
+
+    @property
+    def memory_bytes(self):
+        return sum(size for _, size in self.build_stats.values())
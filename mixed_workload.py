@@ -0,0 +1,397 @@
+import numpy as np
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
+from dataset_version import bump_dataset_version
+from generate_data import init_generator, iter_product_records
+from index_benchmark import INSERT_SKU_OFFSET
+from schema import ensure_schema
+
+# Параметры смешанной нагрузки
+MIXED_DURATION = 60
+READER_COUNT = 4
+WRITER_COUNT = 1
+# Суммарная частота записи, строк в секунду, и доля обновлений среди них
+WRITE_RATE = 200.0
+UPDATE_SHARE = 0.5
+WRITE_TICK = 0.1
+REPORT_WINDOW = 5.0
+# Настройки GIN-индексов: (fastupdate, gin_pending_list_limit в кБ; None - значение сервера)
+GIN_SETTINGS = [(True, None), (True, 256), (False, None)]
+# Вставленные строки получают артикулы из отдельного диапазона и удаляются после прогона;
+# обновляются только они, чтобы исходный набор данных оставался неизменным
+MIXED_SKU_OFFSET = 8000000000
+WRITER_SKU_STRIDE = 100000000
+# Диапазоны писателей не должны заходить в артикулы замера вставки index_benchmark; внутри
+# этой границы артикулы остаются десятизначными, и удаление по строковому диапазону корректно
+MAX_WRITERS = (INSERT_SKU_OFFSET - MIXED_SKU_OFFSET) // WRITER_SKU_STRIDE
+
+
+def parse_gin_settings(text):
+    """Разбирает строку вида on,on:256,off в список (fastupdate, gin_pending_list_limit)"""
+    settings = []
+    for item in text.split(','):
+        mode, _, limit = item.strip().partition(':')
+        if mode not in ('on', 'off'):
+            raise ValueError(f"Неизвестное значение fastupdate: {mode}")
+        settings.append((mode == 'on', int(limit) if limit else None))
+    return settings
+
+
+class MixedWorkload:
+    """Поиск под непрерывной вставкой и обновлением products при разных настройках GIN-индексов"""
+
+    def __init__(self, db_config, session_id, duration=MIXED_DURATION, readers=READER_COUNT,
+                 writers=WRITER_COUNT, write_rate=WRITE_RATE, update_share=UPDATE_SHARE,
+                 window=REPORT_WINDOW, seed=None):
+        if not 1 <= writers <= MAX_WRITERS:
+            raise ValueError(f"Число писателей должно быть от 1 до {MAX_WRITERS}")
+        self.db_config = db_config
+        self.session_id = session_id
+        self.duration = duration
+        self.readers = readers
+        self.writers = writers
+        self.write_rate = write_rate
+        self.update_share = update_share
+        self.window = window
+        self.seed = seed
+        self.pending_available = True
+
+    def _ensure_schema(self, connection):
+        ensure_schema(connection, ['mixed_workload_results'])
+        # Размер списка ожидания GIN читает pgstatginindex из pgstattuple
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS pgstattuple;")
+                connection.commit()
+        except Exception as error:
+            print(f"Размер списка ожидания GIN недоступен: {error}")
+            connection.rollback()
+            self.pending_available = False
+
+    def _gin_indexes(self, connection):
+        """Имена GIN-индексов products и индексы, в которых лежат их данные"""
+        # Индекс секционированной products не принимает ALTER INDEX SET и не имеет списка
+        # ожидания: настройки и замеры относятся к индексам секций. Для обычного индекса
+        # pg_partition_tree строк не возвращает
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                           SELECT c.relname, COALESCE(leaf.relname, c.relname)
+                           FROM pg_index i
+                           JOIN pg_class c ON c.oid = i.indexrelid
+                           JOIN pg_am am ON am.oid = c.relam
+                           LEFT JOIN LATERAL (
+                               SELECT relid FROM pg_partition_tree(c.oid) WHERE isleaf
+                           ) tree ON true
+                           LEFT JOIN pg_class leaf ON leaf.oid = tree.relid
+                           WHERE i.indrelid = 'products'::regclass
+                             AND am.amname = 'gin'
+                           ORDER BY c.relname, leaf.relname;
+                           """)
+            rows = cursor.fetchall()
+        connection.commit()
+        return list(dict.fromkeys(name for name, _ in rows)), [leaf for _, leaf in rows]
+
+    def _apply_gin_settings(self, connection, indexes, fastupdate, pending_limit):
+        with connection.cursor() as cursor:
+            for index_name in indexes:
+                index = sql.Identifier(index_name)
+                # Список ожидания прошлого прогона не должен достаться следующему
+                cursor.execute("SELECT gin_clean_pending_list(%s::regclass);", (index_name,))
+                cursor.execute(sql.SQL("ALTER INDEX {} RESET (gin_pending_list_limit);").format(index))
+                cursor.execute(sql.SQL("ALTER INDEX {} SET (fastupdate = {});").format(
+                    index, sql.SQL('on' if fastupdate else 'off')))
+                if pending_limit is not None:
+                    cursor.execute(sql.SQL("ALTER INDEX {} SET (gin_pending_list_limit = {});").format(
+                        index, sql.Literal(pending_limit)))
+            connection.commit()
+
+    def _reset_gin_settings(self, connection, indexes):
+        with connection.cursor() as cursor:
+            for index_name in indexes:
+                cursor.execute(sql.SQL("ALTER INDEX {} RESET (fastupdate, gin_pending_list_limit);").format(
+                    sql.Identifier(index_name)))
+            connection.commit()
+
+    def _pending_list(self, connection, indexes):
+        """Суммарные страницы и записи списков ожидания GIN-индексов"""
+        if not self.pending_available or not indexes:
+            return None, None
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                           SELECT SUM(s.pending_pages), SUM(s.pending_tuples)
+                           FROM unnest(%s::text[]) AS index_name,
+                                LATERAL pgstatginindex(index_name::regclass) AS s;
+                           """, (indexes,))
+            pages, tuples = cursor.fetchone()
+        connection.commit()
+        return pages, tuples
+
+    def _reader(self, pool, queries, terms, reader_id, started, stop_at):
+        connection = pool.getconn()
+        samples = []
+        errors = []
+        methods = list(queries.items())
+        position = reader_id
+        try:
+            with connection.cursor() as cursor:
+                while time.perf_counter() < stop_at:
+                    method, query = methods[position % len(methods)]
+                    term = terms[(position // len(methods)) % len(terms)]
+                    start_time = time.perf_counter()
+                    try:
+                        cursor.execute(query, {'term': term})
+                        cursor.fetchall()
+                        samples.append((start_time - started, method, (time.perf_counter() - start_time) * 1000))
+                        # Открытая транзакция читателя удерживала бы снимок и мешала VACUUM
+                        connection.commit()
+                    except Exception:
+                        connection.rollback()
+                        errors.append((start_time - started, method))
+                    position += self.readers
+        finally:
+            pool.putconn(connection)
+        return samples, errors
+
+    def _writer(self, pool, writer_id, started, stop_at):
+        connection = pool.getconn()
+        writes = []
+        # id строк, вставленных этим писателем за прогон: только они и обновляются
+        inserted_ids = []
+        records = iter_product_records(1 << 40, MIXED_SKU_OFFSET + writer_id * WRITER_SKU_STRIDE)
+        rng = np.random.default_rng(None if self.seed is None else self.seed + writer_id)
+        # Частота делится между писателями; за тик пишется накопленная дробная часть
+        rate = self.write_rate / self.writers
+        owed = 0.0
+        scheduled = started
+        try:
+            with connection.cursor() as cursor:
+                while scheduled < stop_at:
+                    delay = scheduled - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+
+                    owed += rate * WRITE_TICK
+                    count = int(owed)
+                    owed -= count
+                    # Пока своих строк меньше, чем нужно обновить, недостающие обновления становятся вставками
+                    updates = min(int(rng.binomial(count, self.update_share)), len(inserted_ids)) if count else 0
+                    inserts = count - updates
+                    batch = [next(records) for _ in range(count)]
+                    scheduled += WRITE_TICK
+
+                    try:
+                        new_ids = []
+                        if inserts:
+                            new_ids = [product_id for product_id, in execute_values(cursor, """
+                                       INSERT INTO products (name, description, category, brand, sku)
+                                       VALUES %s
+                                       RETURNING id
+                                       """, batch[:inserts], fetch=True)]
+                        if updates:
+                            # Новое название и описание у разных своих строк; id по возрастанию
+                            # дают писателям одинаковый порядок блокировок
+                            ids = sorted(inserted_ids[position]
+                                         for position in rng.choice(len(inserted_ids), updates, replace=False))
+                            execute_values(cursor, """
+                                           UPDATE products
+                                           SET name = v.name, description = v.description
+                                           FROM (VALUES %s) AS v (id, name, description)
+                                           WHERE products.id = v.id
+                                           """, [(product_id, record[0], record[1])
+                                                 for product_id, record in zip(ids, batch[inserts:])])
+                        connection.commit()
+                    except Exception as error:
+                        # Сбой одного тика не останавливает запись: порция пропускается
+                        print(f"  Ошибка писателя {writer_id}: {error}")
+                        connection.rollback()
+                        continue
+                    inserted_ids.extend(new_ids)
+                    writes.append((time.perf_counter() - started, inserts, updates))
+        except Exception as error:
+            print(f"  Писатель {writer_id} остановлен: {error}")
+        finally:
+            pool.putconn(connection)
+        return writes
+
+    def _sampler(self, pool, indexes, started, stop_at, samples, stop_event):
+        connection = pool.getconn()
+        try:
+            while True:
+                samples.append((time.perf_counter() - started, *self._pending_list(connection, indexes)))
+                if stop_event.wait(min(self.window, max(stop_at - time.perf_counter(), 0))):
+                    break
+        except Exception as error:
+            print(f"  Ошибка чтения списка ожидания GIN: {error}")
+            connection.rollback()
+        finally:
+            pool.putconn(connection)
+
+    def run_setting(self, pool, queries, terms, indexes):
+        """Один прогон: читатели и писатели работают одновременно duration секунд"""
+        pending = []
+        stop_event = threading.Event()
+        started = time.perf_counter()
+        stop_at = started + self.duration
+        sampler = threading.Thread(target=self._sampler,
+                                   args=(pool, indexes, started, stop_at, pending, stop_event))
+        sampler.start()
+        try:
+            with ThreadPoolExecutor(max_workers=self.readers + self.writers) as executor:
+                writers = [
+                    executor.submit(self._writer, pool, writer_id, started, stop_at)
+                    for writer_id in range(self.writers)
+                ]
+                readers = [
+                    executor.submit(self._reader, pool, queries, terms, reader_id, started, stop_at)
+                    for reader_id in range(self.readers)
+                ]
+                samples, errors, writes = [], [], []
+                for future in readers:
+                    reader_samples, reader_errors = future.result()
+                    samples.extend(reader_samples)
+                    errors.extend(reader_errors)
+                for future in writers:
+                    writes.extend(future.result())
+        finally:
+            stop_event.set()
+            sampler.join()
+
+        return self._summarize(queries, samples, errors, writes, pending)
+
+    def _summarize(self, queries, samples, errors, writes, pending):
+        """Перцентили задержек по окнам REPORT_WINDOW для каждого метода"""
+        windows = int(np.ceil(self.duration / self.window))
+        pending_by_window = {}
+        for moment, pages, tuples in pending:
+            # В окно записывается последний замер, сделанный не позже его конца
+            pending_by_window[min(int(moment // self.window), windows - 1)] = (pages, tuples)
+
+        inserted = np.zeros(windows, dtype=int)
+        updated = np.zeros(windows, dtype=int)
+        for moment, inserts, updates in writes:
+            window = min(int(moment // self.window), windows - 1)
+            inserted[window] += inserts
+            updated[window] += updates
+        # Фактическая частота записи: сбойные тики и отставание от расписания ее снижают
+        actual_rate = float(inserted.sum() + updated.sum()) / self.duration
+
+        latencies = {}
+        for moment, method, latency in samples:
+            latencies.setdefault((min(int(moment // self.window), windows - 1), method), []).append(latency)
+        failed = {}
+        for moment, method in errors:
+            key = (min(int(moment // self.window), windows - 1), method)
+            failed[key] = failed.get(key, 0) + 1
+
+        results = []
+        for window in range(windows):
+            pages, tuples = pending_by_window.get(window, (None, None))
+            for method in queries:
+                timings = np.asarray(latencies.get((window, method), []), dtype=float)
+                p50 = p99 = None
+                if len(timings):
+                    p50, p99 = (float(value) for value in np.percentile(timings, [50, 99]))
+                results.append({
+                    'method': method,
+                    'window_start_s': window * self.window,
+                    'requests': len(timings) + failed.get((window, method), 0),
+                    'errors': failed.get((window, method), 0),
+                    'p50_ms': p50,
+                    'p99_ms': p99,
+                    'inserted_rows': int(inserted[window]),
+                    'updated_rows': int(updated[window]),
+                    'actual_write_rate': actual_rate,
+                    'pending_pages': pages,
+                    'pending_tuples': tuples
+                })
+        return results
+
+    def _save_results(self, connection, results, dataset_size, fastupdate, pending_limit):
+        with connection.cursor() as cursor:
+            execute_values(cursor, """
+                           INSERT INTO mixed_workload_results (test_run_id, method, dataset_size, fastupdate,
+                                                               gin_pending_list_limit, write_rate,
+                                                               actual_write_rate, window_start_s,
+                                                               requests, errors, p50_ms,
+                                                               p99_ms, inserted_rows, updated_rows,
+                                                               pending_pages, pending_tuples)
+                           VALUES %s
+                           """, [(
+                self.session_id, result['method'], dataset_size, fastupdate, pending_limit, self.write_rate,
+                result['actual_write_rate'], result['window_start_s'], result['requests'], result['errors'],
+                result['p50_ms'], result['p99_ms'], result['inserted_rows'], result['updated_rows'],
+                result['pending_pages'], result['pending_tuples']
+            ) for result in results])
+            connection.commit()
+
+    def _remove_inserted(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM products WHERE sku >= %s AND sku < %s;", (
+                f"ID-{MIXED_SKU_OFFSET:010d}", f"ID-{MIXED_SKU_OFFSET + self.writers * WRITER_SKU_STRIDE:010d}"
+            ))
+            connection.commit()
+        # Мертвые версии строк прогона не должны достаться следующей настройке; VACUUM - вне транзакции
+        connection.autocommit = True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("VACUUM products;")
+        finally:
+            connection.autocommit = False
+
+    def run(self, search_queries, terms, settings=GIN_SETTINGS):
+        """Прогоняет смешанную нагрузку при каждой настройке GIN-индексов и сохраняет результаты по окнам"""
+        init_generator(self.seed)
+        pool = ThreadedConnectionPool(1, self.readers + self.writers + 2, **self.db_config)
+        control_conn = pool.getconn()
+        indexes = []
+        results = []
+        try:
+            self._ensure_schema(control_conn)
+            index_names, indexes = self._gin_indexes(control_conn)
+            with control_conn.cursor() as cursor:
+                cursor.execute("SELECT COUNT(id) FROM products;")
+                dataset_size = cursor.fetchone()[0]
+            control_conn.commit()
+
+            print(f"\nСмешанная нагрузка: {self.duration} с на настройку, читателей {self.readers}, "
+                  f"запись {self.write_rate:g} строк/с (обновлений {self.update_share:.0%}), "
+                  f"GIN-индексы: {', '.join(index_names) or 'нет'}")
+            for fastupdate, pending_limit in settings:
+                self._apply_gin_settings(control_conn, indexes, fastupdate, pending_limit)
+                try:
+                    setting_results = self.run_setting(pool, search_queries, terms, indexes)
+                finally:
+                    self._remove_inserted(control_conn)
+                self._save_results(control_conn, setting_results, dataset_size, fastupdate, pending_limit)
+                results.extend(setting_results)
+
+                label = f"fastupdate={'on' if fastupdate else 'off'}"
+                if pending_limit is not None:
+                    label += f", gin_pending_list_limit={pending_limit}kB"
+                if setting_results:
+                    label += f", запись {setting_results[0]['actual_write_rate']:.0f} строк/с"
+                print(f"  {label}")
+                for result in setting_results:
+                    p99 = f"{result['p99_ms']:.1f}" if result['p99_ms'] is not None else "-"
+                    pages = result['pending_pages'] if result['pending_pages'] is not None else "-"
+                    print(
+                        f"    {result['window_start_s']:>6.0f} с | "
+                        f"{result['method']:<12} | "
+                        f"p99: {p99:>7} мс | "
+                        f"Запись: {result['inserted_rows'] + result['updated_rows']:>6} | "
+                        f"Список ожидания: {pages} стр."
+                    )
+        finally:
+            try:
+                self._reset_gin_settings(control_conn, indexes)
+                # Во время прогона products менялась: кэши, заполненные в это время, недействительны
+                bump_dataset_version(control_conn)
+            finally:
+                pool.putconn(control_conn)
+                pool.closeall()
+
+        return results
@@ -0,0 +1,126 @@
+import re
+import sys
+import time
+from collections import OrderedDict
+from dataset_version import get_dataset_version
+
+# Параметры кэша результатов поиска
+CACHE_MAX_BYTES = 64 * 2 ** 20
+CACHE_TTL = 300.0
+# Как часто кэш сверяет версию набора данных с базой, с
+VERSION_CHECK_INTERVAL = 1.0
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_query(term, lower=True):
+    """Приводит текст запроса к виду ключа: одиночные пробелы и, если lower, нижний регистр"""
+    term = WHITESPACE_PATTERN.sub(' ', term).strip()
+    return term.lower() if lower else term
+
+
+def result_footprint(key, result):
+    """Оценка памяти записи кэша: ключ, список выдачи и его кортежи"""
+    size = sys.getsizeof(key) + sum(sys.getsizeof(part) for part in key) + sys.getsizeof(result)
+    for row in result:
+        size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+    return size
+
+
+class QueryResultCache:
+    """LRU-кэш выдачи методов поиска с TTL, ограничением памяти и сбросом при смене версии данных"""
+
+    def __init__(self, connection, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL,
+                 version_check_interval=VERSION_CHECK_INTERVAL, case_sensitive=()):
+        self.connection = connection
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.version_check_interval = version_check_interval
+        # Методы, выдача которых зависит от регистра запроса: их ключи регистр сохраняют
+        self.case_sensitive = frozenset(case_sensitive)
+        self.version = None
+        self.checked_at = None
+        # (метод, нормализованный запрос) -> (выдача, размер записи, момент устаревания)
+        self.entries = OrderedDict()
+        self.memory_bytes = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def hit_rate(self):
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+    def clear(self):
+        self.entries.clear()
+        self.memory_bytes = 0
+
+    def _refresh_version(self):
+        # Версию увеличивают загрузчики products; опрос базы ограничен интервалом
+        now = time.monotonic()
+        if self.checked_at is not None and now - self.checked_at < self.version_check_interval:
+            return
+        self.checked_at = now
+        # Только чтение: кэш не создает таблиц и не фиксирует транзакцию владельца соединения
+        version = get_dataset_version(self.connection)
+        if version != self.version:
+            if self.version is not None:
+                self.invalidations += 1
+            self.version = version
+            self.clear()
+
+    def _key(self, method, term):
+        return method, normalize_query(term, lower=method not in self.case_sensitive)
+
+    def _remove(self, key):
+        _, size, _ = self.entries.pop(key)
+        self.memory_bytes -= size
+
+    def get(self, method, term):
+        """Возвращает сохраненную выдачу или None"""
+        self._refresh_version()
+        key = self._key(method, term)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[2] <= time.monotonic():
+            self._remove(key)
+            self.expired += 1
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, method, term, result):
+        """Сохраняет выдачу, вытесняя давно не использованные записи сверх лимита памяти"""
+        key = self._key(method, term)
+        result = list(result)
+        size = result_footprint(key, result)
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self._remove(key)
+
+        self.entries[key] = (result, size, time.monotonic() + self.ttl)
+        self.memory_bytes += size
+        while self.memory_bytes > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def fetch(self, method, term, search):
+        """Выдача из кэша или от search(term) с сохранением; второй элемент - признак попадания"""
+        result = self.get(method, term)
+        if result is not None:
+            return result, True
+        result = search(term)
+        self.put(method, term, result)
+        return result, False
@@ -0,0 +1,62 @@
+from dataset_version import get_dataset_version
+from schema import ensure_schema
+
+
+class RelevanceCache:
+    """Эталонные множества id по термину, вычисляемые один раз на версию набора данных"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.version = None
+        self.sets = {}
+        # Таблица создается один раз при создании кэша; проверка версии в get() только читает
+        ensure_schema(connection, ['relevance_sets'])
+
+    def _refresh_version(self):
+        version = get_dataset_version(self.connection)
+        if version != self.version:
+            # Данные перезагружены: локальная копия и записи прошлых версий больше не нужны
+            self.version = version
+            self.sets = {}
+            with self.connection.cursor() as cursor:
+                cursor.execute("DELETE FROM relevance_sets WHERE dataset_version <> %s;", (version,))
+                self.connection.commit()
+
+    def prefetch(self, terms):
+        """Вычисляет недостающие эталонные множества одним запросом и загружает их в память"""
+        self._refresh_version()
+        keys = sorted({term.lower() for term in terms} - self.sets.keys())
+        if not keys:
+            return
+
+        with self.connection.cursor() as cursor:
+            # Отсортированные массивы id строятся на стороне сервера, без передачи клиенту
+            cursor.execute("""
+                           INSERT INTO relevance_sets (term, dataset_version, product_ids)
+                           SELECT t.term,
+                                  %(version)s,
+                                  COALESCE(array_agg(p.id ORDER BY p.id) FILTER (WHERE p.id IS NOT NULL),
+                                           '{}')
+                           FROM unnest(%(terms)s::text[]) AS t(term)
+                           LEFT JOIN products p ON p.name ILIKE '%%' || t.term || '%%'
+                           WHERE NOT EXISTS (SELECT 1
+                                             FROM relevance_sets rs
+                                             WHERE rs.term = t.term
+                                               AND rs.dataset_version = %(version)s)
+                           GROUP BY t.term
+                           ON CONFLICT (term, dataset_version) DO NOTHING;
+                           """, {'version': self.version, 'terms': keys})
+            cursor.execute("""
+                           SELECT term, product_ids
+                           FROM relevance_sets
+                           WHERE dataset_version = %s
+                             AND term = ANY(%s);
+                           """, (self.version, keys))
+            for term, product_ids in cursor.fetchall():
+                self.sets[term] = frozenset(product_ids)
+            self.connection.commit()
+
+    def get(self, term):
+        """Возвращает множество id товаров, название которых содержит термин"""
+        self.prefetch([term])
+        return self.sets[term.lower()]
@@ -1,24 +1,362 @@
+import argparse
+import io
+import json
+import numpy as np
+import os
 import psycopg2
+import subprocess
 import time
 import uuid
 from psycopg2 import sql
+from psycopg2.extras import execute_values
+
+import generate_data
+from dataset_version import bump_dataset_version
+from db_profiler import SAMPLE_INTERVAL, MethodProfiler
+from index_benchmark import INSERT_ROWS, MAINTENANCE_WORK_MEM_LEVELS, IndexBuildBenchmark
+from load_test import CONCURRENCY_LEVELS, LOAD_DURATION, LoadGenerator
+from memory_engine import InMemorySearchEngine
+from mixed_workload import (MAX_WRITERS, MIXED_DURATION, READER_COUNT, WRITE_RATE, WRITER_COUNT, MixedWorkload,
+                            parse_gin_settings)
+from query_cache import CACHE_MAX_BYTES, CACHE_TTL, QueryResultCache
+from relevance_cache import RelevanceCache
+from scenarios import TEST_SCENARIOS
+from schema import ensure_schema
+from workload import ZIPF_EXPONENT
 
 DB_CONFIG = {
     'database': 'fuzzy_search_lab',
     'user': 'postgres',
     'password': '7842590Ff',
     'host': 'localhost',
-    'port': '5432'
+    'port': '5432',
+    # Порог word_similarity для операторов <% и <<->: значение по умолчанию 0.6
+    # отсекает перестановки букв в коротких словах
+    'options': '-c pg_trgm.word_similarity_threshold=0.4'
+}
+
+# Размер выдачи для методов с ранжированием
+TOP_K_LIMIT = 50
+
+# Каждый метод возвращает id, name и оценку близости (для методов без оценки - NULL)
+SEARCH_METHODS = {
+    'ILIKE': sql.SQL("SELECT id, name, NULL::real AS score FROM products WHERE name ILIKE '%%' || {term} || '%%'"),
+    'Trigram': sql.SQL("SELECT id, name, similarity(name, {term}) AS score FROM products WHERE name %% {term}"),
+    'Levenshtein': sql.SQL("""
+        SELECT id, name, levenshtein(name, {term}) AS score
+        FROM products
+        WHERE levenshtein(name, {term}) <= 3
+    """),
+    'Soundex': sql.SQL("""
+        SELECT id, name, NULL::real AS score
+        FROM products
+        WHERE soundex(name) = soundex({term})
+    """),
+    'FTS': sql.SQL("""
+        SELECT id, name, ts_rank(search_vector, plainto_tsquery('english', {term})) AS score
+        FROM products
+        WHERE search_vector @@ plainto_tsquery('english', {term})
+    """),
+    # Кандидаты по GIN-индексу триграмм, затем расстояние Левенштейна по отдельным словам
+    'Trigram+Levenshtein': sql.SQL("""
+        SELECT id, name, word_similarity({term}, name) AS score
+        FROM products
+        WHERE {term} <%% name
+          AND EXISTS (SELECT 1
+                      FROM unnest(string_to_array(lower(name), ' ')) AS token
+                      WHERE levenshtein_less_equal(token, lower({term}), 2) <= 2)
+    """),
+    # Top-K ближайших по триграммному расстоянию через GiST-индекс
+    'Trigram KNN': sql.SQL("""
+        SELECT id, name, name <-> {term} AS score
+        FROM products
+        ORDER BY name <-> {term}
+        LIMIT {limit}
+    """),
+    'Word similarity': sql.SQL("""
+        SELECT id, name, word_similarity({term}, name) AS score
+        FROM products
+        WHERE {term} <%% name
+    """),
+    # Совпадение кода Metaphone хотя бы одного слова; обслуживается idx_products_name_metaphone
+    'Metaphone': sql.SQL("""
+        SELECT id, name, NULL::real AS score
+        FROM products
+        WHERE name_metaphone_keys(name) && name_metaphone_keys({term})
+    """),
+    # Кандидаты берутся только из индексируемых методов (GIN триграмм и FTS),
+    # затем переранжируются взвешенной суммой сигналов; Левенштейн и фонетика
+    # считаются лишь для кандидатов, без последовательного сканирования
+    'Hybrid': sql.SQL("""
+        WITH candidates AS (
+            SELECT id FROM products WHERE {term} <%% name
+            UNION
+            SELECT id FROM products WHERE search_vector @@ plainto_tsquery('english', {term})
+        )
+        SELECT p.id, p.name,
+               (0.40 * word_similarity({term}, p.name)
+                + 0.20 * ts_rank(p.search_vector, plainto_tsquery('english', {term}))
+                + 0.25 * (1 - LEAST(tokens.distance, 3) / 3.0)
+                + 0.15 * tokens.phonetic::int)::real AS score
+        FROM candidates
+        JOIN products p USING (id)
+        CROSS JOIN LATERAL (
+            SELECT MIN(levenshtein_less_equal(token, lower({term}), 3)) AS distance,
+                   COALESCE(bool_or(dmetaphone(token) = dmetaphone({term})), FALSE)
+                       OR name_metaphone_keys(p.name) && name_metaphone_keys({term}) AS phonetic
+            FROM unnest(string_to_array(lower(p.name), ' ')) AS token
+        ) tokens
+        ORDER BY score DESC
+        LIMIT {limit}
+    """),
+    # Поиск по фонетическим ключам отдельных слов (GIN по products.phonetic_keys);
+    # оценка - число совпавших ключей, поэтому совпадение по всем алгоритмам выше
+    'PhoneticTokens': sql.SQL("""
+        SELECT id, name,
+               cardinality(ARRAY(SELECT unnest(phonetic_keys)
+                                 INTERSECT
+                                 SELECT unnest(name_phonetic_keys({term}))))::real AS score
+        FROM products
+        WHERE phonetic_keys && name_phonetic_keys({term})
+        ORDER BY score DESC
+    """)
 }
 
+# Методы, выдача которых зависит от регистра запроса (levenshtein сравнивает строки как есть);
+# кэш приложения не приводит их запросы к нижнему регистру
+CASE_SENSITIVE_METHODS = {'Levenshtein'}
+
+# Объекты 01_create_schema.sql, которые раннер создает или дополняет в существующей базе
+RESULT_SCHEMA_OBJECTS = (
+    'search_benchmarks', 'search_query_plans', 'idx_search_query_plans_benchmark', 'search_results',
+    'idx_search_results_method_query', 'idx_search_results_run', 'engine_builds', 'query_cache_benchmarks'
+)
+FULLTEXT_SCHEMA_OBJECTS = ('products.search_vector', 'idx_products_search_vector_missing',
+                           'products_search_vector_update')
+PHONETIC_SCHEMA_OBJECTS = ('products.phonetic_keys', 'name_phonetic_keys', 'products_phonetic_keys_update',
+                           'idx_products_phonetic_keys_missing')
+
+
+# Методы прикладного движка в памяти процесса: имя метода -> метод InMemorySearchEngine
+PYTHON_ENGINE_METHODS = {
+    "Py Trigram": 'search_trigram',
+    "Py SymSpell": 'search_edit_distance',
+    "Py Soundex": 'search_phonetic'
+}
+
+
+def compile_search_query(query_template):
+    return query_template.format(term=sql.Placeholder('term'), limit=sql.Literal(TOP_K_LIMIT))
+
+
+def compile_prepare_statement(statement, query_template, connection):
+    # Текст PREPARE передается без параметров, поэтому экранирование %% снимается
+    query_text = query_template.format(term=sql.SQL('$1'), limit=sql.Literal(TOP_K_LIMIT)).as_string(connection)
+    prepare = sql.SQL("PREPARE {} (text) AS ").format(sql.Identifier(statement)).as_string(connection)
+    return prepare + query_text.replace('%%', '%')
+
+
+# Размеры набора данных по умолчанию для режима развертки
+SWEEP_SIZES = [10000, 100000, 1000000, 10000000]
+
+# Значения max_parallel_workers_per_gather для режима --parallel-workers
+PARALLEL_WORKER_LEVELS = [0, 2, 4, 8]
+
+# Число запросов скошенного потока для режима --query-cache
+CACHE_BENCHMARK_REQUESTS = 2000
+
+# Размер порции при дозаполнении поисковых векторов
+SEARCH_VECTOR_BATCH_SIZE = 50000
+
+# Параметры повторных замеров
+WARMUP_ITERATIONS = 2
+MEASURED_ITERATIONS = 10
+CACHE_MODES = ('warm', 'cold')
+RESTART_TIMEOUT = 60
+
+# Способы выполнения запроса: simple - разбор и планирование при каждом вызове,
+# prepared - PREPARE один раз за сессию, cursor - именованный курсор с порционной выборкой
+EXECUTION_MODES = ('simple', 'prepared', 'cursor')
+SERVER_CURSOR_NAME = 'benchmark_search'
+
+# Параметры буферизации результатов: сброс по числу строк, по времени и в конце сценария
+FLUSH_MAX_ROWS = 500
+FLUSH_MAX_AGE = 60
+FLUSH_MAX_FOUND_ROWS = 200000
+SPILL_FILE = 'results/benchmarks_spill.jsonl'
+
+BENCHMARK_COLUMNS = (
+    'method', 'dataset_size', 'query_text', 'execution_time_ms', 'result_count',
+    'index_used', 'test_run_id', 'scenario', 'cache_mode', 'iterations',
+    'p50_ms', 'p95_ms', 'p99_ms', 'stddev_ms', 'samples_ms',
+    'execution_mode', 'prepare_ms', 'fetch_ms', 'parallel_workers'
+)
+SEARCH_RESULT_COLUMNS = ('test_run_id', 'method', 'query', 'dataset_size', 'product_id', 'rank', 'score')
+PLAN_COLUMNS = (
+    'execution_time_ms', 'planning_time_ms', 'shared_hit_blocks', 'shared_read_blocks',
+    'index_names', 'node_types', 'plan', 'workers_planned', 'workers_launched'
+)
+
+
+class BenchmarkResultBuffer:
+    """Накапливает результаты замеров в памяти и записывает их пакетно"""
+
+    def __init__(self, max_rows=FLUSH_MAX_ROWS, max_age=FLUSH_MAX_AGE, spill_path=SPILL_FILE,
+                 max_found_rows=FLUSH_MAX_FOUND_ROWS):
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self.max_found_rows = max_found_rows
+        self.spill_path = spill_path
+        self.rows = []
+        self.plans = []
+        self.found = []
+        self.found_rows = 0
+        self.last_flush = time.monotonic()
+
+    def add(self, row, plan=None, found=None):
+        self.rows.append(tuple(row))
+        self.plans.append(tuple(plan) if plan else None)
+        self.found.append([tuple(item) for item in found] if found else [])
+        self.found_rows += len(self.found[-1])
+
+    def is_due(self):
+        return (len(self.rows) >= self.max_rows
+                or self.found_rows >= self.max_found_rows
+                or time.monotonic() - self.last_flush >= self.max_age)
+
+    def _copy_search_results(self, cursor, rows, found):
+        buffer = io.StringIO()
+        columns = dict(zip(BENCHMARK_COLUMNS, zip(*rows)))
+        for method, query, size, run_id, items in zip(columns['method'], columns['query_text'],
+                                                      columns['dataset_size'], columns['test_run_id'], found):
+            for rank, (product_id, score) in enumerate(items, start=1):
+                buffer.write(generate_data.format_copy_row((run_id, method, query, size, product_id, rank, score)))
+
+        if buffer.tell():
+            buffer.seek(0)
+            cursor.copy_expert(
+                f"COPY search_results ({', '.join(SEARCH_RESULT_COLUMNS)}) FROM STDIN", buffer
+            )
+
+    def flush(self, connection):
+        if not self.rows:
+            return 0
+
+        rows, plans, found = self.rows, self.plans, self.found
+        try:
+            with connection.cursor() as cursor:
+                # Одна многострочная вставка; RETURNING сохраняет порядок строк VALUES
+                benchmark_ids = execute_values(
+                    cursor,
+                    f"INSERT INTO search_benchmarks ({', '.join(BENCHMARK_COLUMNS)}) VALUES %s RETURNING id",
+                    rows,
+                    page_size=len(rows),
+                    fetch=True
+                )
+                plan_rows = [
+                    (benchmark_id, *plan)
+                    for (benchmark_id,), plan in zip(benchmark_ids, plans)
+                    if plan
+                ]
+                if plan_rows:
+                    execute_values(
+                        cursor,
+                        f"INSERT INTO search_query_plans (benchmark_id, {', '.join(PLAN_COLUMNS)}) VALUES %s",
+                        plan_rows,
+                        page_size=len(plan_rows)
+                    )
+                # Найденные id с рангом и оценкой загружаются через COPY
+                self._copy_search_results(cursor, rows, found)
+            connection.commit()
+        except psycopg2.Error as error:
+            if not connection.closed:
+                connection.rollback()
+            if not self.spill_path:
+                raise
+            self._spill(rows, plans, found)
+            print(f"База недоступна ({error}), результаты ({len(rows)}) сохранены в {self.spill_path}")
+
+        self.rows, self.plans, self.found = [], [], []
+        self.found_rows = 0
+        self.last_flush = time.monotonic()
+        return len(rows)
+
+    def _spill(self, rows, plans, found):
+        directory = os.path.dirname(self.spill_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.spill_path, 'a', encoding='utf-8') as spill:
+            for row, plan, items in zip(rows, plans, found):
+                spill.write(json.dumps({'benchmark': row, 'plan': plan, 'found': items}, ensure_ascii=False))
+                spill.write('\n')
+
+    def replay(self, connection, path=None):
+        """Загружает ранее выгруженные в файл результаты обратно в базу"""
+        path = path or self.spill_path
+        if not os.path.exists(path):
+            return 0
+
+        # Отдельный буфер без файла выгрузки: если запись не удалась, результаты остаются
+        # только в исходном файле и не дописываются в него повторно следующим flush()
+        replayed = BenchmarkResultBuffer(spill_path=None)
+        with open(path, encoding='utf-8') as spill:
+            for line in spill:
+                record = json.loads(line)
+                replayed.add(record['benchmark'], record['plan'], record.get('found'))
+
+        loaded = replayed.flush(connection)
+        os.remove(path)
+        return loaded
+
 
 class SearchPerformanceAnalyzer:
-    def __init__(self, db_config):
+    def __init__(self, db_config, warmup=WARMUP_ITERATIONS, iterations=MEASURED_ITERATIONS,
+                 cache_mode='warm', restart_command=None, spill_path=SPILL_FILE, python_engine=False,
+                 prepared=False, itersize=0, profile=False, profile_interval=SAMPLE_INTERVAL):
+        if cache_mode not in CACHE_MODES:
+            raise ValueError(f"Неизвестный режим кэша: {cache_mode}")
+        if prepared and itersize:
+            # DECLARE CURSOR принимает только SELECT/VALUES, но не EXECUTE
+            raise ValueError("Подготовленные запросы нельзя читать через именованный курсор")
+
+        self.db_config = db_config
         self.db_conn = psycopg2.connect(**db_config)
         self.session_id = uuid.uuid4().hex
+        self.scenario = 'default'
+        self.scenarios = TEST_SCENARIOS
+        self.warmup = warmup
+        self.iterations = max(iterations, 1)
+        self.cache_mode = cache_mode
+        self.restart_command = restart_command
+        self.results = BenchmarkResultBuffer(spill_path=spill_path)
+        self.relevance = RelevanceCache(self.db_conn)
+        self.engine = InMemorySearchEngine() if python_engine else None
+        self.engine_version = None
+        self.itersize = itersize
+        self.execution_mode = 'prepared' if prepared else 'cursor' if itersize else 'simple'
+        # Имя метода -> (имя подготовленного оператора, текст PREPARE); стоимость подготовки
+        # в результатах - Planning Time из EXPLAIN, а не время однократного PREPARE
+        self.prepared = {}
+        # Значение max_parallel_workers_per_gather; None - настройка сервера по умолчанию
+        self.parallel_workers = None
+        self.profiler = MethodProfiler(db_config, self.session_id, profile_interval) if profile else None
         print(f"Начало тестовой сессии: {self.session_id}")
+        self._ensure_schema()
         self._setup_fulltext_search()
         self._install_extensions()
+        self._setup_phonetic_keys()
+        if self.profiler:
+            self.profiler.setup(self.db_conn)
+        if cache_mode == 'cold' and not restart_command:
+            self._install_buffercache()
+
+    def _ensure_schema(self):
+        # Новые столбцы и таблицы результатов берутся из 01_create_schema.sql
+        try:
+            ensure_schema(self.db_conn, RESULT_SCHEMA_OBJECTS)
+        except Exception as error:
+            print(f"Ошибка обновления схемы: {error}")
+            self.db_conn.rollback()
 
     def _install_extensions(self):
         try:
@@ -26,25 +364,112 @@ class SearchPerformanceAnalyzer:
                 cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
                 cursor.execute("CREATE EXTENSION IF NOT EXISTS fuzzystrmatch;")
                 self.db_conn.commit()
+            # Функция ключей Metaphone для баз, созданных до ее появления в схеме
+            ensure_schema(self.db_conn, ['name_metaphone_keys'])
         except Exception as error:
             print(f"Ошибка установки расширений: {error}")
             self.db_conn.rollback()
 
-    def _setup_fulltext_search(self):
+    def _install_buffercache(self):
         try:
             with self.db_conn.cursor() as cursor:
-                cursor.execute("""
-                               ALTER TABLE products
-                                   ADD COLUMN IF NOT EXISTS search_vector tsvector;
-
-                               UPDATE products
-                               SET search_vector = to_tsvector('english', name || ' ' || description);
-                               """)
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_buffercache;")
+                cursor.execute("SELECT to_regproc('pg_buffercache_evict') IS NOT NULL;")
+                supported = cursor.fetchone()[0]
                 self.db_conn.commit()
+        except Exception as error:
+            self.db_conn.rollback()
+            raise RuntimeError(f"Не удалось установить pg_buffercache: {error}") from error
+
+        if not supported:
+            raise RuntimeError(
+                "pg_buffercache_evict() недоступна (нужен PostgreSQL 17+); "
+                "для холодного кэша укажите --restart-command"
+            )
+
+    def _connect_after_restart(self):
+        deadline = time.monotonic() + RESTART_TIMEOUT
+        while True:
+            try:
+                return psycopg2.connect(**self.db_config)
+            except psycopg2.OperationalError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.5)
+
+    def _evict_caches(self):
+        if self.restart_command:
+            # Перезапуск экземпляра (и, при необходимости, сброс page cache ОС)
+            # выполняет внешняя команда, например
+            # "pg_ctl restart -D data -w && sync && echo 3 > /proc/sys/vm/drop_caches"
+            # Счетчики и pid профиля относятся к прежнему процессу сервера; сам перезапуск в профиль не входит
+            if self.profiler:
+                self.profiler.suspend(self.db_conn)
+            self.db_conn.close()
+            subprocess.run(self.restart_command, shell=True, check=True)
+            self.db_conn = self._connect_after_restart()
+            self.relevance.connection = self.db_conn
+            # Подготовленные операторы и SET живут в сессии и пропадают вместе с ней
+            with self.db_conn.cursor() as cursor:
+                for _, prepare_text in self.prepared.values():
+                    cursor.execute(prepare_text)
+            if self.parallel_workers is not None:
+                self._set_parallel_workers(self.parallel_workers)
+            if self.profiler:
+                self.profiler.resume(self.db_conn)
+            return
+
+        # Вытесняем из shared buffers все страницы текущей базы; page cache ОС при этом сохраняется
+        with self.db_conn.cursor() as cursor:
+            cursor.execute("""
+                           SELECT COUNT(pg_buffercache_evict(bufferid))
+                           FROM pg_buffercache
+                           WHERE reldatabase = (SELECT oid FROM pg_database WHERE datname = current_database())
+                           """)
+            self.db_conn.commit()
+
+    def _setup_fulltext_search(self):
+        try:
+            # Вектор поддерживается триггером: пересчитываются только новые и измененные строки
+            ensure_schema(self.db_conn, FULLTEXT_SCHEMA_OBJECTS)
+            updated = self._backfill_missing('search_vector')
+            if updated:
+                print(f"Поисковые векторы обновлены для {updated} записей")
         except Exception as error:
             print(f"Ошибка настройки полнотекстового поиска: {error}")
             self.db_conn.rollback()
 
+    def _setup_phonetic_keys(self):
+        try:
+            ensure_schema(self.db_conn, PHONETIC_SCHEMA_OBJECTS)
+            updated = self._backfill_missing('phonetic_keys')
+            if updated:
+                print(f"Фонетические ключи обновлены для {updated} записей")
+        except Exception as error:
+            print(f"Ошибка настройки фонетических ключей: {error}")
+            self.db_conn.rollback()
+
+    def _backfill_missing(self, column):
+        # Строки без вычисляемого столбца (загруженные до появления триггера) дозаполняются
+        # порциями; пустое присваивание name вызывает триггеры products
+        updated = 0
+        with self.db_conn.cursor() as cursor:
+            while True:
+                cursor.execute(sql.SQL("""
+                                       UPDATE products
+                                       SET name = name
+                                       WHERE id IN (SELECT id
+                                                    FROM products
+                                                    WHERE {column} IS NULL
+                                                    LIMIT %s);
+                                       """).format(column=sql.Identifier(column)),
+                               (SEARCH_VECTOR_BATCH_SIZE,))
+                self.db_conn.commit()
+                if cursor.rowcount == 0:
+                    break
+                updated += cursor.rowcount
+        return updated
+
     def _compute_metrics(self, retrieved, relevant):
         if not relevant:
             return (0.0, 0.0, 0.0) if retrieved else (1.0, 1.0, 1.0)
@@ -55,81 +480,239 @@ class SearchPerformanceAnalyzer:
         f1 = 2 * precision * recall / (precision + recall) if (precision + recall) else 0
         return (precision, recall, f1)
 
-    def _save_results(self, method, size, query, duration, count, indexed):
-        insert_query = """
-                       INSERT INTO search_benchmarks (method, dataset_size, query_text, \
-                                                      execution_time_ms, result_count, \
-                                                      index_used, test_run_id) \
-                       VALUES (%s, %s, %s, %s, %s, %s, %s) \
-                       """
-        with self.db_conn.cursor() as cursor:
-            cursor.execute(insert_query, (
+    def _summarize_timings(self, samples):
+        timings = np.asarray(samples, dtype=float)
+        p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+        return {
+            'mean': float(timings.mean()),
+            'p50': float(p50),
+            'p95': float(p95),
+            'p99': float(p99),
+            'stddev': float(timings.std(ddof=1)) if len(timings) > 1 else 0.0
+        }
+
+    def _save_results(self, method, size, query, samples, count, indexed, plan=None, found=None, phases=None):
+        stats = self._summarize_timings(samples)
+        phases = phases or {}
+        self.results.add(
+            (
                 method, size, query,
-                duration, count, indexed, self.session_id
-            ))
-            self.db_conn.commit()
+                stats['mean'], count, indexed, self.session_id, self.scenario,
+                self.cache_mode, len(samples), stats['p50'], stats['p95'],
+                stats['p99'], stats['stddev'], list(samples),
+                self.execution_mode, phases.get('prepare_ms'), phases.get('fetch_ms'),
+                self.parallel_workers
+            ),
+            (
+                plan['execution_time'], plan['planning_time'],
+                plan['shared_hit_blocks'], plan['shared_read_blocks'],
+                plan['index_names'], plan['node_types'], json.dumps(plan['plan']),
+                plan['workers_planned'], plan['workers_launched']
+            ) if plan else None,
+            found
+        )
+        if self.results.is_due():
+            self.results.flush(self.db_conn)
+        return stats
+
+    def _walk_plan(self, node):
+        yield node
+        for child in node.get('Plans', []):
+            yield from self._walk_plan(child)
+
+    def _explain_search(self, query_template, search_term):
+        explain_query = sql.SQL("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ") + query_template
+        if self.cache_mode == 'cold':
+            self._evict_caches()
+        with self.db_conn.cursor() as cursor:
+            cursor.execute(explain_query, {'term': search_term})
+            result = cursor.fetchone()[0]
+
+        if isinstance(result, str):
+            result = json.loads(result)
+        plan = result[0]
+        nodes = list(self._walk_plan(plan['Plan']))
+
+        # Счетчики буферов корневого узла уже включают все дочерние узлы
+        return {
+            'execution_time': plan.get('Execution Time', 0.0),
+            'planning_time': plan.get('Planning Time', 0.0),
+            'shared_hit_blocks': plan['Plan'].get('Shared Hit Blocks', 0),
+            'shared_read_blocks': plan['Plan'].get('Shared Read Blocks', 0),
+            'index_names': sorted({node['Index Name'] for node in nodes if 'Index Name' in node}),
+            'node_types': [node['Node Type'] for node in nodes],
+            'plan': plan,
+            # Параллельность указывают узлы Gather и Gather Merge
+            'workers_planned': sum(node.get('Workers Planned', 0) for node in nodes),
+            'workers_launched': sum(node.get('Workers Launched', 0) for node in nodes)
+        }
+
+    def _prepare_search(self, method_name, query_template):
+        # PREPARE выполняется один раз за сессию
+        if method_name not in self.prepared:
+            statement = f"benchmark_{len(self.prepared)}"
+            prepare_text = compile_prepare_statement(statement, query_template, self.db_conn)
+            with self.db_conn.cursor() as cursor:
+                cursor.execute(prepare_text)
+            self.prepared[method_name] = (statement, prepare_text)
+
+        statement, _ = self.prepared[method_name]
+        return sql.SQL("EXECUTE {} (%(term)s)").format(sql.Identifier(statement))
 
     def _execute_search(self, query_template, search_term):
+        # Сохраняем порядок выдачи: позиция строки - ее ранг
+        fetch_time = None
         start_time = time.perf_counter()
-        results = set()
-        try:
+        if self.itersize:
+            # DECLARE только разбирает и планирует запрос; выполнение идет по ходу FETCH,
+            # строки приходят порциями по itersize и не накапливаются в памяти клиента целиком
+            with self.db_conn.cursor(name=SERVER_CURSOR_NAME) as cursor:
+                cursor.itersize = self.itersize
+                cursor.execute(query_template, {'term': search_term})
+                fetch_start = time.perf_counter()
+                found = [(row[0], row[2]) for row in cursor]
+                fetch_time = (time.perf_counter() - fetch_start) * 1000
+        else:
+            # execute() возвращается, когда все строки уже переданы клиенту:
+            # отдельной фазы получения строк здесь нет
             with self.db_conn.cursor() as cursor:
-                cursor.execute(query_template, (search_term,))
+                cursor.execute(query_template, {'term': search_term})
+                found = [(row[0], row[2]) for row in cursor.fetchall() if row]
+        end_time = time.perf_counter()
 
-                # Явно получаем описание столбцов
-                col_names = [desc[0] for desc in cursor.description]
+        return (end_time - start_time) * 1000, len(found), found, {'fetch_ms': fetch_time}
 
-                for row in cursor.fetchall():
-                    if row and len(row) > 0:  # Двойная проверка
-                        results.add(row[0])
+    def _measure_search(self, query_template, search_term, method=None):
+        # Прогрев имеет смысл только для теплого кэша
+        if self.cache_mode == 'warm':
+            for _ in range(self.warmup):
+                self._execute_search(query_template, search_term)
 
-        except Exception as e:
-            print(f"Ошибка выполнения запроса: {e}")
-            return (0, 0, set())
+        # Счетчики профиля снимаются после прогрева: в профиль метода входят только измеренные итерации
+        if self.profiler and method:
+            self.profiler.begin(self.db_conn, method)
+        samples = []
+        fetch_times = []
+        try:
+            for _ in range(self.iterations):
+                if self.cache_mode == 'cold':
+                    self._evict_caches()
+                duration, count, found, phases = self._execute_search(query_template, search_term)
+                samples.append(duration)
+                if phases['fetch_ms'] is not None:
+                    fetch_times.append(phases['fetch_ms'])
+        except Exception:
+            # Снимок счетчиков в end() нельзя сделать в прерванной транзакции
+            self.db_conn.rollback()
+            raise
+        finally:
+            # Без end() выборки ожиданий продолжали бы идти в профиль сбойного метода;
+            # EXPLAIN ANALYZE после замеров в профиль метода не входит
+            if self.profiler and method:
+                self.profiler.end(self.db_conn)
 
-        return (
-            (time.perf_counter() - start_time) * 1000,
-            len(results),
-            results
-        )
+        phases = {'fetch_ms': float(np.mean(fetch_times)) if fetch_times else None}
+        return samples, count, found, phases
+
+    def _build_engine(self, data_size):
+        # Индексы в памяти перестраиваются только при смене версии набора данных
+        if self.engine_version == self.relevance.version:
+            return
+
+        print("\nПостроение индексов прикладного движка...")
+        build_stats = self.engine.build(self.db_conn)
+        self.engine_version = self.relevance.version
+        with self.db_conn.cursor() as cursor:
+            execute_values(cursor, """
+                           INSERT INTO engine_builds (test_run_id, dataset_size, component,
+                                                      build_time_ms, memory_bytes)
+                           VALUES %s
+                           """, [
+                (self.session_id, data_size, component, build_time, memory)
+                for component, (build_time, memory) in build_stats.items()
+            ])
+            self.db_conn.commit()
+
+        for component, (build_time, memory) in build_stats.items():
+            print(f"  {component:<12} | Построение: {build_time:>9.1f} мс | Память: {memory / 2 ** 20:>8.1f} МБ")
+
+    def _measure_engine(self, search, search_term):
+        # Кэш СУБД к движку в памяти не относится, поэтому прогрев выполняется в любом режиме
+        for _ in range(self.warmup):
+            search(search_term)
+
+        samples = []
+        for _ in range(self.iterations):
+            start_time = time.perf_counter()
+            # Как и парные SQL-методы (Trigram, Levenshtein, Soundex), движок возвращает
+            # полное множество без LIMIT: обрезка неранжированных id исказила бы полноту
+            found = search(search_term)
+            samples.append((time.perf_counter() - start_time) * 1000)
+
+        return samples, len(found), found
+
+    def _execute_engine_tests(self, data_size, typo, reference):
+        for method_name, search_name in PYTHON_ENGINE_METHODS.items():
+            try:
+                samples, count, found = self._measure_engine(getattr(self.engine, search_name), typo)
+                prec, rec, f1 = self._compute_metrics({product_id for product_id, _ in found}, reference)
+                stats = self._save_results(
+                    method=method_name,
+                    size=data_size,
+                    query=typo,
+                    samples=samples,
+                    count=count,
+                    indexed=True,
+                    found=found
+                )
+
+                print(
+                    f"  {method_name:<12} | "
+                    f"p50: {stats['p50']:>6.1f} мс | "
+                    f"p95: {stats['p95']:>6.1f} мс | "
+                    f"σ: {stats['stddev']:>5.1f} | "
+                    f"Результаты: {count:<3} | "
+                    f"Точность: {prec:.2f} | "
+                    f"Полнота: {rec:.2f} | "
+                    f"F1: {f1:.2f}"
+                )
+            except Exception as e:
+                print(f"  Ошибка в методе {method_name}: {e}")
 
     def _get_dataset_size(self):
         with self.db_conn.cursor() as cursor:
             cursor.execute("SELECT COUNT(id) FROM products;")
             return cursor.fetchone()[0]
 
-    def _get_reference_items(self, correct_term):
+    def load_workload(self, limit=None):
+        """Заменяет встроенные сценарии запросами из test_queries (см. workload.py)"""
         with self.db_conn.cursor() as cursor:
-            cursor.execute(
-                "SELECT name FROM products WHERE name ILIKE %s;",
-                ('%' + correct_term + '%',)
-            )
-            return {row[0] for row in cursor.fetchall() if row}
+            cursor.execute("""
+                           SELECT correct_term, typo_term, error_type
+                           FROM test_queries
+                           ORDER BY id
+                           LIMIT %s;
+                           """, (limit,))
+            scenarios = cursor.fetchall()
+            self.db_conn.commit()
+
+        if not scenarios:
+            raise ValueError("таблица test_queries пуста; запустите workload.py")
+        self.scenarios = scenarios
+        self.scenario = 'workload'
+        return len(scenarios)
+
+    def _get_reference_items(self, correct_term):
+        return self.relevance.get(correct_term)
 
     def execute_tests(self):
         print("\nЗапуск тестов производительности...")
         data_size = self._get_dataset_size()
+        self.relevance.prefetch([correct for correct, _, _ in self.scenarios])
+        if self.engine:
+            self._build_engine(data_size)
 
-        test_scenarios = [
-            ('computer', 'copmuter', 'перестановка'),
-            ('monitor', 'mointor', 'перестановка'),
-            ('keyboard', 'keybord', 'пропуск буквы'),
-            ('software', 'sofware', 'пропуск буквы'),
-            ('processor', 'processsor', 'добавление буквы'),
-            ('adapter', 'adappter', 'добавление буквы'),
-            ('mouse', 'mouce', 'замена буквы'),
-            ('windows', 'windovs', 'замена буквы')
-        ]
-
-        search_methods = {
-            'ILIKE': sql.SQL("SELECT name FROM products WHERE name ILIKE '%' || {} || '%'"),
-            'Trigram': sql.SQL("SELECT name FROM products WHERE name %% {}"),
-            'Levenshtein': sql.SQL("SELECT name FROM products WHERE levenshtein(name, {}) <= 3"),
-            'Soundex': sql.SQL("SELECT name FROM products WHERE soundex(name) = soundex({})"),
-            'FTS': sql.SQL("SELECT name FROM products WHERE search_vector @@ plainto_tsquery('english', {})")
-        }
-
-        for correct, typo, error_type in test_scenarios:
+        for correct, typo, error_type in self.scenarios:
             print(f"\nТестирование: '{typo}' (Ошибка: {error_type})")
             reference = self._get_reference_items(correct)
 
@@ -137,24 +720,39 @@ class SearchPerformanceAnalyzer:
                 print(f"  Эталонные данные для '{correct}' не найдены")
                 continue
 
-            for method_name, query_template in search_methods.items():
+            for method_name, query_template in SEARCH_METHODS.items():
                 try:
-                    compiled_query = query_template.format(sql.Placeholder())
-                    duration, count, results = self._execute_search(compiled_query, typo)
-                    prec, rec, f1 = self._compute_metrics(results, reference)
+                    if self.execution_mode == 'prepared':
+                        compiled_query = self._prepare_search(method_name, query_template)
+                    else:
+                        compiled_query = compile_search_query(query_template)
+                    samples, count, found, phases = self._measure_search(compiled_query, typo, method_name)
+                    prec, rec, f1 = self._compute_metrics({product_id for product_id, _ in found}, reference)
+                    plan = self._explain_search(compiled_query, typo)
+                    # Планирование - по Planning Time из EXPLAIN в том же режиме выполнения:
+                    # для EXECUTE это выбор общего или частного плана при каждом вызове,
+                    # а однократный PREPARE (разбор и переписывание) в замеры не входит
+                    phases['prepare_ms'] = plan['planning_time']
 
-                    self._save_results(
+                    stats = self._save_results(
                         method=method_name,
                         size=data_size,
                         query=typo,
-                        duration=duration,
+                        samples=samples,
                         count=count,
-                        indexed=method_name in ['Trigram', 'FTS']
+                        indexed=bool(plan['index_names']),
+                        plan=plan,
+                        found=found,
+                        phases=phases
                     )
 
                     print(
                         f"  {method_name:<12} | "
-                        f"Время: {duration:>6.1f} мс | "
+                        f"p50: {stats['p50']:>6.1f} мс | "
+                        f"p95: {stats['p95']:>6.1f} мс | "
+                        f"σ: {stats['stddev']:>5.1f} | "
+                        f"Сервер: {plan['execution_time']:>6.1f} мс | "
+                        f"Воркеры: {plan['workers_launched']}/{plan['workers_planned']} | "
                         f"Результаты: {count:<3} | "
                         f"Точность: {prec:.2f} | "
                         f"Полнота: {rec:.2f} | "
@@ -162,16 +760,259 @@ class SearchPerformanceAnalyzer:
                     )
                 except Exception as e:
                     print(f"  Ошибка в методе {method_name}: {e}")
+                    self.db_conn.rollback()
+
+            if self.engine:
+                self._execute_engine_tests(data_size, typo, reference)
+
+        # Запись результатов вынесена за пределы замеров
+        self.results.flush(self.db_conn)
+        if self.profiler:
+            print("\nСерверный профиль методов:")
+            self.profiler.save(self.db_conn, data_size)
+
+    def _grow_dataset(self, target_size, seed=None, chunk_size=generate_data.CHUNK_SIZE):
+        current_size = self._get_dataset_size()
+        if current_size >= target_size:
+            return current_size
+
+        with self.db_conn.cursor() as cursor:
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM products;")
+            start = cursor.fetchone()[0]
+
+        # Новые строки продолжают нумерацию артикулов с максимального id
+        generate_data.init_generator(None if seed is None else generate_data.shard_seed(seed, start))
+        definitions = generate_data.read_index_definitions()
+        generate_data.drop_indexes(self.db_conn, definitions)
+        bump_dataset_version(self.db_conn)
+        try:
+            generate_data.stream_to_database(
+                self.db_conn,
+                generate_data.iter_product_records(target_size - current_size, start),
+                chunk_size
+            )
+            self._setup_fulltext_search()
+        finally:
+            print("Перестроение индексов и сбор статистики...")
+            generate_data.rebuild_indexes(self.db_conn, definitions)
+
+        return self._get_dataset_size()
+
+    def _set_parallel_workers(self, workers):
+        # SET фиксируется отдельной транзакцией, чтобы откат после ошибки метода его не отменил
+        with self.db_conn.cursor() as cursor:
+            cursor.execute(sql.SQL("SET max_parallel_workers_per_gather = {};").format(sql.Literal(workers)))
+            self.db_conn.commit()
+        self.parallel_workers = workers
+
+    def execute_parallel(self, levels):
+        """Повторяет сценарии при разных max_parallel_workers_per_gather"""
+        self.scenario = 'parallel'
+        for workers in levels:
+            print(f"\n=== max_parallel_workers_per_gather = {workers} ===")
+            self._set_parallel_workers(workers)
+            # Общий план подготовленного оператора мог быть выбран при прежней настройке
+            if self.prepared:
+                with self.db_conn.cursor() as cursor:
+                    cursor.execute("DEALLOCATE ALL;")
+                    self.db_conn.commit()
+                self.prepared = {}
+            self.execute_tests()
+
+    def execute_cache_benchmark(self, requests=CACHE_BENCHMARK_REQUESTS, max_bytes=CACHE_MAX_BYTES,
+                                ttl=CACHE_TTL, zipf=ZIPF_EXPONENT, seed=None):
+        """Сравнивает задержки скошенного потока запросов без кэша и через кэш результатов"""
+        self.scenario = 'query_cache'
+        data_size = self._get_dataset_size()
+        # Популярность запроса убывает по закону Ципфа с его позицией в сценариях
+        typos = [typo for _, typo, _ in self.scenarios]
+        popularity = np.arange(1, len(typos) + 1) ** -float(zipf)
+        rng = np.random.default_rng(seed)
+        stream = [typos[index] for index in rng.choice(len(typos), size=requests, p=popularity / popularity.sum())]
+        print(f"\nКэш результатов: {requests} запросов, различных {len(set(stream))}, "
+              f"Ципф {zipf:g}, лимит {max_bytes / 2 ** 20:g} МБ, TTL {ttl:g} с")
+
+        cache = QueryResultCache(self.db_conn, max_bytes, ttl, case_sensitive=CASE_SENSITIVE_METHODS)
+        for method_name, query_template in SEARCH_METHODS.items():
+            try:
+                if self.execution_mode == 'prepared':
+                    compiled_query = self._prepare_search(method_name, query_template)
+                else:
+                    compiled_query = compile_search_query(query_template)
+
+                def search(term):
+                    return self._execute_search(compiled_query, term)[2]
+
+                uncached = []
+                for term in stream:
+                    start_time = time.perf_counter()
+                    search(term)
+                    uncached.append((time.perf_counter() - start_time) * 1000)
+
+                # Каждый метод начинает с пустого кэша, чтобы доля попаданий не зависела от порядка
+                cache.clear()
+                cache.reset_stats()
+                cached = []
+                for term in stream:
+                    start_time = time.perf_counter()
+                    cache.fetch(method_name, term, search)
+                    cached.append((time.perf_counter() - start_time) * 1000)
+
+                uncached_stats = self._summarize_timings(uncached)
+                cached_stats = self._summarize_timings(cached)
+                with self.db_conn.cursor() as cursor:
+                    cursor.execute("""
+                                   INSERT INTO query_cache_benchmarks (test_run_id, method, dataset_size,
+                                                                       requests, distinct_queries,
+                                                                       zipf_exponent, cache_max_bytes, ttl_s,
+                                                                       hit_rate, evictions, memory_bytes,
+                                                                       entries, uncached_p50_ms,
+                                                                       uncached_p99_ms, uncached_mean_ms,
+                                                                       cached_p50_ms, cached_p99_ms,
+                                                                       cached_mean_ms)
+                                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                                   """, (
+                        self.session_id, method_name, data_size, requests, len(set(stream)), zipf,
+                        max_bytes, ttl, cache.hit_rate, cache.evictions, cache.memory_bytes,
+                        len(cache.entries), uncached_stats['p50'], uncached_stats['p99'],
+                        uncached_stats['mean'], cached_stats['p50'], cached_stats['p99'], cached_stats['mean']
+                    ))
+                    self.db_conn.commit()
+
+                print(
+                    f"  {method_name:<12} | "
+                    f"Попадания: {cache.hit_rate:.1%} | "
+                    f"Память: {cache.memory_bytes / 2 ** 20:>6.2f} МБ | "
+                    f"Вытеснено: {cache.evictions:<5} | "
+                    f"p50: {uncached_stats['p50']:>6.1f} -> {cached_stats['p50']:>6.2f} мс | "
+                    f"p99: {uncached_stats['p99']:>6.1f} -> {cached_stats['p99']:>6.1f} мс"
+                )
+            except Exception as e:
+                print(f"  Ошибка в методе {method_name}: {e}")
+                self.db_conn.rollback()
+
+    def execute_sweep(self, sizes, seed=None):
+        self.scenario = 'sweep'
+        for target_size in sorted(sizes):
+            print(f"\n=== Шаг развертки: {target_size} записей ===")
+            data_size = self._grow_dataset(target_size, seed)
+            if data_size != target_size:
+                print(f"  В таблице уже {data_size} записей, шаг {target_size} пропущен")
+                continue
+            self.execute_tests()
 
     def close_connection(self):
+        if self.profiler:
+            self.profiler.stop()
         if self.db_conn:
+            self.results.flush(self.db_conn)
             self.db_conn.close()
 
 
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Бенчмарк методов нечеткого поиска')
+    parser.add_argument('--sweep', nargs='?', const=','.join(map(str, SWEEP_SIZES)),
+                        help='последовательно наращивать products до указанных размеров, '
+                             'например 10000,100000,1000000')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed генератора данных для режима развертки')
+    parser.add_argument('--warmup', type=int, default=WARMUP_ITERATIONS,
+                        help='число прогревочных выполнений каждого запроса')
+    parser.add_argument('--iterations', type=int, default=MEASURED_ITERATIONS,
+                        help='число измеряемых выполнений каждого запроса')
+    parser.add_argument('--cache-mode', choices=CACHE_MODES, default='warm',
+                        help='теплый кэш или вытеснение кэша перед каждым замером')
+    parser.add_argument('--restart-command',
+                        help='команда перезапуска локального экземпляра для холодного кэша')
+    parser.add_argument('--spill-file', default=SPILL_FILE,
+                        help='файл для результатов, если база недоступна при записи')
+    parser.add_argument('--replay-spill', action='store_true',
+                        help='загрузить в базу результаты из --spill-file и завершить работу')
+    parser.add_argument('--load', nargs='?', const=','.join(map(str, CONCURRENCY_LEVELS)),
+                        help='нагрузочный режим с указанными уровнями параллелизма, например 1,8,32')
+    parser.add_argument('--load-duration', type=float, default=LOAD_DURATION,
+                        help='длительность каждого уровня нагрузки, с')
+    parser.add_argument('--target-rate', type=float, default=0.0,
+                        help='целевая суммарная частота запросов в секунду (0 - замкнутый цикл)')
+    parser.add_argument('--index-build', nargs='?', const=','.join(MAINTENANCE_WORK_MEM_LEVELS),
+                        help='замерить построение, объем и цену вставки каждого индекса из 02_create_indexes.sql '
+                             'при указанных maintenance_work_mem, например 64MB,1GB')
+    parser.add_argument('--insert-rows', type=int, default=INSERT_ROWS,
+                        help='число строк в замере скорости вставки для --index-build')
+    parser.add_argument('--mixed', nargs='?', const='on,on:256,off',
+                        help='поиск под непрерывной записью при настройках GIN-индексов fastupdate[:gin_pending_list_limit], '
+                             'например on,on:256,off')
+    parser.add_argument('--mixed-duration', type=float, default=MIXED_DURATION,
+                        help='длительность смешанной нагрузки для каждой настройки, с')
+    parser.add_argument('--readers', type=int, default=READER_COUNT,
+                        help='число читателей в смешанной нагрузке')
+    parser.add_argument('--writers', type=int, default=WRITER_COUNT,
+                        help=f'число писателей в смешанной нагрузке (не больше {MAX_WRITERS})')
+    parser.add_argument('--write-rate', type=float, default=WRITE_RATE,
+                        help='суммарная частота вставок и обновлений в смешанной нагрузке, строк/с')
+    parser.add_argument('--query-cache', nargs='?', type=int, const=CACHE_BENCHMARK_REQUESTS,
+                        help='сравнить скошенный поток запросов без кэша и через кэш результатов '
+                             '(необязательно - число запросов)')
+    parser.add_argument('--cache-size', type=float, default=CACHE_MAX_BYTES / 2 ** 20,
+                        help='лимит памяти кэша результатов, МБ')
+    parser.add_argument('--cache-ttl', type=float, default=CACHE_TTL,
+                        help='время жизни записи кэша результатов, с')
+    parser.add_argument('--profile', action='store_true',
+                        help='собирать серверный профиль методов: pg_stat_statements, pg_statio, события ожидания')
+    parser.add_argument('--profile-interval', type=float, default=SAMPLE_INTERVAL,
+                        help='интервал опроса событий ожидания pg_stat_activity, с')
+    parser.add_argument('--python-engine', action='store_true',
+                        help='дополнительно замерить прикладной поиск в памяти процесса')
+    parser.add_argument('--parallel-workers', nargs='?', const=','.join(map(str, PARALLEL_WORKER_LEVELS)),
+                        help='повторить тесты при указанных max_parallel_workers_per_gather, например 0,2,4,8')
+    parser.add_argument('--workload', nargs='?', type=int, const=0,
+                        help='брать запросы из test_queries вместо встроенных сценариев '
+                             '(необязательно - не больше указанного числа)')
+    execution = parser.add_mutually_exclusive_group()
+    execution.add_argument('--prepared', action='store_true',
+                           help='подготавливать запрос каждого метода один раз за сессию (PREPARE/EXECUTE)')
+    execution.add_argument('--itersize', type=int, default=0,
+                           help='читать результаты именованным курсором порциями указанного размера')
+    return parser.parse_args()
+
+
 if __name__ == '__main__':
-    tester = SearchPerformanceAnalyzer(DB_CONFIG)
+    args = parse_arguments()
+    tester = SearchPerformanceAnalyzer(DB_CONFIG, args.warmup, args.iterations,
+                                       args.cache_mode, args.restart_command, args.spill_file,
+                                       args.python_engine, args.prepared, args.itersize,
+                                       args.profile, args.profile_interval)
     try:
-        tester.execute_tests()
+        if args.workload is not None:
+            print(f"Загружено запросов рабочей нагрузки: {tester.load_workload(args.workload or None)}")
+        if args.replay_spill:
+            print(f"Загружено результатов из файла: {tester.results.replay(tester.db_conn)}")
+        elif args.sweep:
+            tester.execute_sweep([int(size) for size in args.sweep.split(',')], args.seed)
+        elif args.parallel_workers:
+            tester.execute_parallel([int(workers) for workers in args.parallel_workers.split(',')])
+        elif args.index_build:
+            IndexBuildBenchmark(DB_CONFIG, tester.session_id, args.insert_rows).run(
+                tester.db_conn, args.index_build.split(',')
+            )
+        elif args.mixed:
+            MixedWorkload(DB_CONFIG, tester.session_id, args.mixed_duration, args.readers,
+                          args.writers, args.write_rate, seed=args.seed).run(
+                {name: compile_search_query(template) for name, template in SEARCH_METHODS.items()},
+                [typo for _, typo, _ in tester.scenarios],
+                parse_gin_settings(args.mixed)
+            )
+        elif args.query_cache:
+            tester.execute_cache_benchmark(args.query_cache, int(args.cache_size * 2 ** 20),
+                                           args.cache_ttl, seed=args.seed)
+        elif args.load:
+            LoadGenerator(DB_CONFIG, tester.session_id, args.load_duration, args.target_rate).run(
+                {name: compile_search_query(template) for name, template in SEARCH_METHODS.items()},
+                [typo for _, typo, _ in tester.scenarios],
+                [int(level) for level in args.load.split(',')]
+            )
+        else:
+            tester.execute_tests()
     except Exception as e:
         print(f"Критическая ошибка выполнения тестов: {e}")
     finally:
@@ -0,0 +1,12 @@
+# Встроенный набор запросов; метки типов ошибок совпадают с workload.ERROR_TYPES.
+# Отдельный модуль без зависимостей: его используют и раннер бенчмарка, и анализ результатов
+TEST_SCENARIOS = [
+    ('computer', 'copmuter', 'transposition'),
+    ('monitor', 'mointor', 'transposition'),
+    ('keyboard', 'keybord', 'deletion'),
+    ('software', 'sofware', 'deletion'),
+    ('processor', 'processsor', 'insertion'),
+    ('adapter', 'adappter', 'insertion'),
+    ('mouse', 'mouce', 'substitution'),
+    ('windows', 'windovs', 'substitution')
+]
@@ -0,0 +1,104 @@
+import re
+
+# Единственный источник DDL: модули создают свои таблицы, функции и триггеры командами этого скрипта
+SCHEMA_SCRIPT = '01_create_schema.sql'
+
+OBJECT_PATTERN = re.compile(
+    r'^CREATE\s+(?:OR\s+REPLACE\s+)?(?:UNIQUE\s+)?(TABLE|INDEX|FUNCTION|TRIGGER)\s+(\w+)', re.IGNORECASE
+)
+# Комментарий, тело функции в $$, строка в кавычках, разделитель команд или прочий текст
+SQL_TOKEN_PATTERN = re.compile(r"--[^\n]*|\$\$.*?\$\$|'(?:[^']|'')*'|;|[^;'$-]+|[$-]", re.DOTALL)
+TRIGGER_TABLE_PATTERN = re.compile(r'\bON\s+(\w+)', re.IGNORECASE)
+# Ограничения таблицы и столбцы, которые нельзя безопасно добавить в существующую таблицу
+TABLE_CONSTRAINT_PATTERN = re.compile(r'^(PRIMARY|UNIQUE|CONSTRAINT|CHECK|FOREIGN|EXCLUDE)\b', re.IGNORECASE)
+CONSTRAINED_COLUMN_PATTERN = re.compile(r'\b(PRIMARY\s+KEY|REFERENCES|UNIQUE|SERIAL|BIGSERIAL)\b', re.IGNORECASE)
+
+
+def read_schema_statements(path: str = SCHEMA_SCRIPT) -> list[str]:
+    """Читает команды SQL-скрипта; ; внутри строк и тел функций в $$ команду не завершает"""
+    with open(path, encoding='utf-8') as script:
+        text = script.read()
+
+    statements = []
+    current = []
+    for token in SQL_TOKEN_PATTERN.findall(text):
+        if token == ';':
+            statements.append(''.join(current).strip())
+            current = []
+        elif not token.startswith('--'):
+            current.append(token)
+    statements.append(''.join(current).strip())
+    return [statement for statement in statements if statement]
+
+
+def _table_columns(statement: str) -> list[tuple[str, str]]:
+    """Пары (имя столбца, определение) из CREATE TABLE без ограничений уровня таблицы"""
+    body = statement[statement.index('(') + 1:statement.rindex(')')]
+    items, depth, start = [], 0, 0
+    for position, char in enumerate(body):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and not depth:
+            items.append(body[start:position])
+            start = position + 1
+    items.append(body[start:])
+
+    columns = []
+    for item in (' '.join(item.split()) for item in items):
+        if item and not TABLE_CONSTRAINT_PATTERN.match(item):
+            columns.append((item.split()[0], item))
+    return columns
+
+
+def ensure_schema(connection, names, path: str = SCHEMA_SCRIPT):
+    """Создает недостающие объекты скрипта из names: таблицы с новыми столбцами, индексы, функции
+    и триггеры; имя вида таблица.столбец добавляет только этот столбец"""
+    names = set(names)
+    with connection.cursor() as cursor:
+        # Порядок команд скрипта сохраняется: таблица раньше индекса, функция раньше триггера
+        for statement in read_schema_statements(path):
+            match = OBJECT_PATTERN.match(statement)
+            if not match:
+                continue
+            kind, name = match.group(1).upper(), match.group(2)
+
+            if kind == 'TABLE':
+                if name in names:
+                    cursor.execute(f"CREATE TABLE IF NOT EXISTS {name}{statement[match.end():]};")
+                columns = [
+                    (column, definition) for column, definition in _table_columns(statement)
+                    if name in names or f"{name}.{column}" in names
+                ]
+                if not columns:
+                    continue
+                cursor.execute("""
+                               SELECT attname
+                               FROM pg_attribute
+                               WHERE attrelid = to_regclass(%s)
+                                 AND attnum > 0
+                                 AND NOT attisdropped;
+                               """, (name,))
+                existing = {column for column, in cursor.fetchall()}
+                for column, definition in columns:
+                    # Столбец, появившийся в схеме позже таблицы, должен допускать NULL или иметь DEFAULT
+                    if column not in existing and not CONSTRAINED_COLUMN_PATTERN.search(definition):
+                        cursor.execute(f"ALTER TABLE {name} ADD COLUMN IF NOT EXISTS {definition};")
+            elif name not in names:
+                continue
+            elif kind == 'INDEX':
+                cursor.execute(re.sub(r'\bINDEX\s+', 'INDEX IF NOT EXISTS ', statement, count=1) + ';')
+            elif kind == 'TRIGGER':
+                # CREATE OR REPLACE TRIGGER есть только с PostgreSQL 14
+                cursor.execute("""
+                               SELECT 1
+                               FROM pg_trigger
+                               WHERE tgrelid = to_regclass(%s)
+                                 AND tgname = %s;
+                               """, (TRIGGER_TABLE_PATTERN.search(statement).group(1), name))
+                if cursor.fetchone() is None:
+                    cursor.execute(statement + ';')
+            else:
+                cursor.execute(statement + ';')
+    connection.commit()
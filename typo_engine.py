@@ -0,0 +1,118 @@
+import numpy as np
+
+# Коды операций над строкой
+TRANSPOSE, REMOVE, ADD, REPLACE = range(4)
+OPERATIONS = ('transpose', 'remove', 'add', 'replace')
+
+# По умолчанию опечатка вносится в 15% строк, операции равновероятны,
+# что совпадает с поведением modify_text()
+DEFAULT_RATES = {operation: 0.0375 for operation in OPERATIONS}
+
+ALPHABET = np.array(list('abcdefghijklmnopqrstuvwxyz')).view(np.uint32)
+HEX_DIGITS = np.array(list('0123456789ABCDEF')).view(np.uint32)
+
+
+def _to_codes(strings: np.ndarray, width: int) -> np.ndarray:
+    """Представляет массив строк матрицей кодов символов фиксированной ширины"""
+    strings = np.ascontiguousarray(strings, dtype=f'U{max(width, 1)}')
+    return strings.view(np.uint32).reshape(len(strings), -1)
+
+
+def _from_codes(codes: np.ndarray) -> np.ndarray:
+    """Собирает строки обратно из матрицы кодов; нулевые хвосты отбрасываются"""
+    codes = np.ascontiguousarray(codes, dtype=np.uint32)
+    return codes.view(f'U{codes.shape[1]}').reshape(len(codes))
+
+
+def _join(*parts, sep: str = ' ') -> np.ndarray:
+    """Поэлементно склеивает массивы строк через разделитель"""
+    result = parts[0]
+    for part in parts[1:]:
+        result = np.char.add(np.char.add(result, sep), part)
+    return result
+
+
+class TypoEngine:
+    """Пакетная генерация опечаток и названий товаров без построчных вызовов Python"""
+
+    def __init__(self, rates: dict[str, float] | None = None, seed: int | None = None):
+        rates = DEFAULT_RATES if rates is None else rates
+        unknown = set(rates) - set(OPERATIONS)
+        if unknown:
+            raise ValueError(f"Неизвестные операции: {', '.join(sorted(unknown))}")
+
+        self.rates = np.array([rates.get(operation, 0.0) for operation in OPERATIONS])
+        if (self.rates < 0).any() or self.rates.sum() > 1:
+            raise ValueError("Доли операций должны быть неотрицательными и в сумме не больше 1")
+
+        self.thresholds = np.cumsum(self.rates)
+        self.rng = np.random.default_rng(seed)
+
+    def mutate(self, terms) -> tuple[np.ndarray, np.ndarray]:
+        """Вносит опечатки в массив терминов; возвращает новые термины и коды операций (-1 - без изменений)"""
+        terms = np.asarray(terms, dtype=str)
+        count = len(terms)
+        if count == 0:
+            return terms, np.empty(0, dtype=np.int8)
+
+        lengths = np.char.str_len(terms)
+        width = int(lengths.max()) + 1
+
+        # Одна выборка на весь пакет: выбор операции, позиции и буквы
+        draws = self.rng.random((count, 3))
+        operations = np.searchsorted(self.thresholds, draws[:, 0], side='right')
+        operations = np.where((operations < len(OPERATIONS)) & (lengths >= 3), operations, -1)
+
+        max_positions = np.where(operations == TRANSPOSE, lengths - 1, lengths)
+        positions = (draws[:, 1] * np.maximum(max_positions, 1)).astype(np.int64)
+        letters = ALPHABET[(draws[:, 2] * len(ALPHABET)).astype(np.int64)]
+
+        # Два нулевых столбца справа: место под вставку и выход за границу при удалении
+        codes = np.zeros((count, width + 1), dtype=np.uint32)
+        codes[:, :width - 1] = _to_codes(terms, width - 1)
+
+        columns = np.arange(width)
+        pos = positions[:, None]
+        source = np.broadcast_to(columns, (count, width)).astype(np.int64)
+        source += ((operations == REMOVE)[:, None] & (columns >= pos))
+        source -= ((operations == ADD)[:, None] & (columns > pos))
+        swapped = (operations == TRANSPOSE)[:, None]
+        source += swapped & (columns == pos)
+        source -= swapped & (columns == pos + 1)
+
+        result = np.take_along_axis(codes, source, axis=1)
+
+        lettered = np.flatnonzero((operations == ADD) | (operations == REPLACE))
+        result[lettered, positions[lettered]] = letters[lettered]
+
+        return _from_codes(result), operations.astype(np.int8)
+
+    def hex_codes(self, count: int, digits: int = 6) -> np.ndarray:
+        """Генерирует массив случайных шестнадцатеричных кодов в верхнем регистре"""
+        values = self.rng.integers(0, 16 ** digits, size=count, dtype=np.int64)
+        shifts = np.arange(digits - 1, -1, -1) * 4
+        return _from_codes(HEX_DIGITS[(values[:, None] >> shifts) & 0xF])
+
+    def build_names(self, companies, terms, words, codes,
+                    inject_typos: bool = True) -> tuple[np.ndarray, np.ndarray]:
+        """Собирает названия f"{company} {term} {word} {code}" и вносит опечатки в термин"""
+        companies = np.asarray(companies, dtype=str)
+        terms = np.asarray(terms, dtype=str)
+        names = _join(companies, np.char.title(terms), np.char.title(np.asarray(words, dtype=str)),
+                      np.asarray(codes, dtype=str))
+
+        if not inject_typos:
+            return names, np.full(len(names), -1, dtype=np.int8)
+
+        mutated, operations = self.mutate(terms)
+        changed = np.flatnonzero(operations >= 0)
+        if len(changed):
+            # Как и в построчной версии: название приводится к нижнему регистру,
+            # а термин заменяется на искаженный
+            names = names.astype(object)
+            names[changed] = np.char.replace(
+                np.char.lower(names[changed].astype(str)), terms[changed], mutated[changed]
+            )
+            names = names.astype(str)
+
+        return names, operations
@@ -0,0 +1,178 @@
+import argparse
+import numpy as np
+from dataset_version import get_dataset_version
+from generate_data import connect_database, stream_to_database
+from memory_engine import MAX_EDIT_DISTANCE, deletes, levenshtein_within
+from typo_engine import OPERATIONS, TypoEngine
+
+# Параметры рабочей нагрузки по умолчанию
+WORKLOAD_SIZE = 20000
+ZIPF_EXPONENT = 1.1
+# Доли запросов с одной, двумя и т.д. опечатками
+DISTANCE_WEIGHTS = (0.7, 0.3)
+# Примерное число строк products, по которым оцениваются частоты слов
+SAMPLE_ROWS = 200000
+MIN_TOKEN_LENGTH = 4
+# Слово считается опечаткой другого, если то не дальше MAX_EDIT_DISTANCE и встречается
+# хотя бы во столько раз чаще (генератор вносит опечатки в часть названий)
+TYPO_VARIANT_RATIO = 10
+
+# Единые метки типов ошибок для test_queries, раннера и отчетов
+ERROR_TYPES = dict(zip(OPERATIONS, ('transposition', 'deletion', 'insertion', 'substitution')))
+MULTIPLE_ERRORS = 'multiple'
+
+WORKLOAD_COLUMNS = (
+    'correct_term', 'typo_term', 'error_type', 'edit_distance', 'popularity_rank', 'dataset_version'
+)
+
+WORKLOAD_DDL = """
+    ALTER TABLE test_queries
+        ADD COLUMN IF NOT EXISTS edit_distance SMALLINT,
+        ADD COLUMN IF NOT EXISTS popularity_rank INTEGER,
+        ADD COLUMN IF NOT EXISTS dataset_version BIGINT;
+"""
+
+# Частоты латинских слов названий по случайной выборке страниц таблицы;
+# шестизначные артикулы из одних букв a-f словами не считаются
+TOKEN_QUERY = """
+    SELECT token, COUNT(*) AS frequency
+    FROM (SELECT name FROM products TABLESAMPLE SYSTEM (%(percent)s)) AS sample,
+         regexp_split_to_table(lower(sample.name), '[^[:alnum:]]+') AS token
+    WHERE token ~ %(pattern)s
+      AND token !~ '^[0-9a-f]{6}$'
+    GROUP BY token
+    ORDER BY frequency DESC, token
+"""
+
+
+def sample_tokens(connection, sample_rows: int = SAMPLE_ROWS) -> tuple[np.ndarray, np.ndarray]:
+    """Возвращает слова каталога по убыванию частоты и их частоты"""
+    with connection.cursor() as cursor:
+        # Для секционированной products оценка складывается по секциям;
+        # для обычной таблицы pg_partition_tree строк не возвращает
+        cursor.execute("""
+                       SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)
+                       FROM pg_class c
+                       WHERE c.oid = 'products'::regclass AND c.relkind = 'r'
+                          OR c.oid IN (SELECT relid FROM pg_partition_tree('products') WHERE isleaf);
+                       """)
+        estimate = cursor.fetchone()[0]
+        # До первого ANALYZE reltuples равен -1: тогда читается вся таблица
+        percent = 100.0 if estimate <= 0 else min(100.0, 100.0 * sample_rows / estimate)
+        cursor.execute(TOKEN_QUERY, {'percent': percent, 'pattern': f'^[a-z]{{{MIN_TOKEN_LENGTH},}}$'})
+        rows = cursor.fetchall()
+    connection.commit()
+
+    if not rows:
+        raise ValueError("в products нет слов для рабочей нагрузки")
+    tokens, frequencies = zip(*rows)
+    return np.array(tokens, dtype=object), np.array(frequencies, dtype=np.int64)
+
+
+def drop_typo_variants(tokens: np.ndarray, frequencies: np.ndarray,
+                       ratio: float = TYPO_VARIANT_RATIO) -> tuple[np.ndarray, np.ndarray]:
+    """Отбрасывает слова каталога, которые сами являются опечатками более частых слов"""
+    # Слова перебираются по убыванию частоты; кандидаты в оригиналы ищутся по словарю удалений
+    sources = {}
+    keep = []
+    for index, (token, frequency) in enumerate(zip(tokens, frequencies)):
+        variants = deletes(token)
+        candidates = {source for variant in variants for source in sources.get(variant, ())}
+        if any(frequencies[source] >= ratio * frequency
+               and levenshtein_within(tokens[source], token, MAX_EDIT_DISTANCE) is not None
+               for source in candidates):
+            continue
+        keep.append(index)
+        for variant in variants:
+            sources.setdefault(variant, []).append(index)
+    return tokens[keep], frequencies[keep]
+
+
+def build_workload(tokens: np.ndarray, count: int = WORKLOAD_SIZE, zipf: float = ZIPF_EXPONENT,
+                   distance_weights=DISTANCE_WEIGHTS, seed: int | None = None) -> list[tuple]:
+    """Выбирает слова по закону Ципфа и вносит в каждое заданное число опечаток;
+    возвращает кортежи (слово, запрос, тип ошибки, число правок, ранг популярности)"""
+    # Каждый проход mutate() обязательно применяет одну из четырех операций
+    engine = TypoEngine({operation: 1 / len(OPERATIONS) for operation in OPERATIONS}, seed=seed)
+
+    ranks = np.arange(1, len(tokens) + 1)
+    popularity = ranks ** -float(zipf)
+    picked = engine.rng.choice(len(tokens), size=count, p=popularity / popularity.sum())
+
+    weights = np.asarray(distance_weights, dtype=float)
+    distances = engine.rng.choice(np.arange(1, len(weights) + 1), size=count, p=weights / weights.sum())
+
+    correct = tokens[picked]
+    typos = correct.copy()
+    operations = np.full((count, len(weights)), -1, dtype=np.int8)
+    for step in range(int(distances.max())):
+        active = np.flatnonzero(distances > step)
+        mutated, applied = engine.mutate(typos[active].astype(str))
+        typos[active] = mutated
+        operations[active, step] = applied
+
+    # Слишком короткое слово могло пропустить операцию: фиксируется фактическое число правок
+    applied_counts = (operations >= 0).sum(axis=1)
+    records = []
+    for index in np.flatnonzero(typos != correct):
+        if applied_counts[index] == 1:
+            error_type = ERROR_TYPES[OPERATIONS[operations[index, 0]]]
+        else:
+            error_type = MULTIPLE_ERRORS
+        records.append((
+            correct[index], typos[index], error_type,
+            int(applied_counts[index]), int(picked[index]) + 1
+        ))
+    return records
+
+
+def save_workload(connection, records: list[tuple], append: bool = False) -> int:
+    """Записывает запросы в test_queries через COPY; без append заменяет прежнюю сгенерированную нагрузку"""
+    version = get_dataset_version(connection)
+    with connection.cursor() as cursor:
+        cursor.execute(WORKLOAD_DDL)
+        if not append:
+            # Ручные запросы из 03_test_queries.sql не имеют edit_distance и сохраняются
+            cursor.execute("DELETE FROM test_queries WHERE edit_distance IS NOT NULL;")
+        connection.commit()
+
+    return stream_to_database(
+        connection,
+        ((*record, version) for record in records),
+        columns=WORKLOAD_COLUMNS,
+        table='test_queries',
+        verbose=False
+    )
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Генерация рабочей нагрузки запросов по словам каталога')
+    parser.add_argument('--count', type=int, default=WORKLOAD_SIZE,
+                        help='число запросов')
+    parser.add_argument('--zipf', type=float, default=ZIPF_EXPONENT,
+                        help='показатель распределения Ципфа для популярности слов')
+    parser.add_argument('--distance-weights', default=','.join(map(str, DISTANCE_WEIGHTS)),
+                        help='доли запросов с 1, 2, ... опечатками, например 0.7,0.3')
+    parser.add_argument('--sample-rows', type=int, default=SAMPLE_ROWS,
+                        help='примерное число строк products для оценки частот слов')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed для воспроизводимой нагрузки')
+    parser.add_argument('--append', action='store_true',
+                        help='добавить запросы к уже сгенерированным вместо замены')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    db_conn = connect_database()
+    try:
+        tokens, _ = drop_typo_variants(*sample_tokens(db_conn, args.sample_rows))
+        records = build_workload(tokens, args.count, args.zipf,
+                                 [float(weight) for weight in args.distance_weights.split(',')], args.seed)
+        saved = save_workload(db_conn, records, args.append)
+        print(f"Сохранено запросов: {saved} (различных слов в каталоге: {len(tokens)})")
+    except Exception as e:
+        print(f"Ошибка генерации рабочей нагрузки: {e}")
+        db_conn.rollback()
+    finally:
+        db_conn.close()